@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for mdformat.py
+
+Generates synthetic Markdown corpora of a given size and shape, times each
+step of format_markdown() on them and reports lines per second. A corpus
+that formats slower than its threshold fails the run, so a formatter change
+that slows down the nightly batch shows up as a non-zero exit code.
+
+Corpora:
+- nested-lists: deeply nested mixed ordered/unordered lists with sloppy indentation
+- paragraphs: long multi-line paragraphs with trailing whitespace
+- headings: heading-dense documents with short sections
+- blockquotes: runs of blockquote lines between paragraphs
+- blank-storm: content separated by long runs of empty and whitespace-only lines
+- mixed: all of the above interleaved, like a real exported vault
+
+Usage:
+    python bench_mdformat.py
+    python bench_mdformat.py --lines 200000 --corpus nested-lists --corpus mixed
+    python bench_mdformat.py --save baseline.json
+    python bench_mdformat.py --baseline baseline.json --max-slowdown 0.2
+
+Thresholds are absolute lines/second floors (--min-rate, or the per-corpus
+defaults below), and with --baseline, a maximum slowdown relative to the
+rates saved by an earlier --save run on the same machine.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mdformat
+
+
+WORDS = ['note', 'markdown', 'format', 'list', 'item', 'vault', 'export', 'heading', 'quote', 'line',
+         'batch', 'nightly', 'speed', 'table', 'parse', '格式', '笔记', '列表']
+
+
+def words(rng: random.Random, count: int) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def gen_nested_lists(rng: random.Random, line_count: int) -> list:
+    lines = []
+    depth = 0
+    while len(lines) < line_count:
+        depth = max(0, min(8, depth + rng.choice([-2, -1, 0, 1, 1])))
+        indent = ' ' * (depth * rng.choice([2, 3, 4]))
+        marker = rng.choice(['-', '*', '+', f'{rng.randint(1, 20)}.', f'{rng.randint(1, 9)})'])
+        lines.append(f'{indent}{marker} {words(rng, rng.randint(2, 12))}')
+        roll = rng.random()
+        if roll < 0.15:
+            lines.append('')
+        elif roll < 0.2:
+            lines.append(indent + '  ' + words(rng, 8))
+    return lines
+
+
+def gen_paragraphs(rng: random.Random, line_count: int) -> list:
+    lines = []
+    while len(lines) < line_count:
+        for _ in range(rng.randint(1, 8)):
+            lines.append(words(rng, rng.randint(10, 60)) + rng.choice(['', '', '  ', '\t']))
+        lines.append('')
+    return lines
+
+
+def gen_headings(rng: random.Random, line_count: int) -> list:
+    lines = []
+    while len(lines) < line_count:
+        lines.append('#' * rng.randint(1, 6) + ' ' + words(rng, 4))
+        for _ in range(rng.randint(0, 2)):
+            lines.append(words(rng, 12))
+    return lines
+
+
+def gen_blockquotes(rng: random.Random, line_count: int) -> list:
+    lines = []
+    while len(lines) < line_count:
+        for _ in range(rng.randint(1, 10)):
+            lines.append('> ' + words(rng, rng.randint(3, 20)))
+        if rng.random() < 0.7:
+            lines.append(words(rng, 10))
+        if rng.random() < 0.5:
+            lines.append('')
+    return lines
+
+
+def gen_blank_storm(rng: random.Random, line_count: int) -> list:
+    lines = []
+    while len(lines) < line_count:
+        lines.append(rng.choice([words(rng, 8), '- ' + words(rng, 4), '# ' + words(rng, 3)]))
+        for _ in range(rng.randint(5, 50)):
+            lines.append(rng.choice(['', '', ' ', '\t', '    ']))
+    return lines
+
+
+def gen_mixed(rng: random.Random, line_count: int) -> list:
+    generators = [gen_nested_lists, gen_paragraphs, gen_headings, gen_blockquotes, gen_blank_storm]
+    lines = []
+    while len(lines) < line_count:
+        lines.extend(rng.choice(generators)(rng, rng.randint(5, 60)))
+    return lines
+
+
+# name -> (generator, default minimum lines per second)
+CORPORA = {
+    'nested-lists': (gen_nested_lists, 50000),
+    'paragraphs': (gen_paragraphs, 100000),
+    'headings': (gen_headings, 50000),
+    'blockquotes': (gen_blockquotes, 50000),
+    'blank-storm': (gen_blank_storm, 100000),
+    'mixed': (gen_mixed, 50000),
+}
+
+
+def generate_corpus(name: str, line_count: int, seed: int = 0) -> str:
+    """Generate a document of the named shape with line_count lines."""
+    generator, _ = CORPORA[name]
+    lines = generator(random.Random(seed), line_count)
+    return '\n'.join(lines[:line_count])
+
+
+def time_steps(content: str, repeat: int) -> dict:
+    """Time each step of format_markdown(), keeping the best of repeat runs."""
+    timings = {name: float('inf') for name, _ in mdformat.FORMAT_STEPS}
+    for _ in range(repeat):
+        result = content
+        for name, step in mdformat.FORMAT_STEPS:
+            start = time.perf_counter()
+            result = step(result)
+            timings[name] = min(timings[name], time.perf_counter() - start)
+    return timings
+
+
+def run_benchmark(names: list, line_count: int, repeat: int, seed: int) -> dict:
+    results = {}
+    for name in names:
+        content = generate_corpus(name, line_count, seed)
+        steps = time_steps(content, repeat)
+        total = sum(steps.values())
+        results[name] = {
+            'lines': line_count,
+            'steps': steps,
+            'total': total,
+            'lines_per_sec': line_count / total if total else float('inf'),
+        }
+    return results
+
+
+def check_thresholds(results: dict, min_rate, baseline: dict, max_slowdown: float) -> list:
+    """Return a failure message for every corpus below its threshold."""
+    failures = []
+    for name, result in results.items():
+        rate = result['lines_per_sec']
+        floor = min_rate if min_rate is not None else CORPORA[name][1]
+        if rate < floor:
+            failures.append(f'{name}: {rate:,.0f} lines/s is below the minimum of {floor:,.0f}')
+        if baseline and name in baseline:
+            base_rate = baseline[name]['lines_per_sec']
+            if rate < base_rate * (1 - max_slowdown):
+                slowdown = 1 - rate / base_rate
+                failures.append(f'{name}: {rate:,.0f} lines/s is {slowdown:.0%} slower than the baseline {base_rate:,.0f}')
+    return failures
+
+
+def print_report(results: dict) -> None:
+    step_names = [name for name, _ in mdformat.FORMAT_STEPS]
+    header = ['corpus', 'lines'] + step_names + ['total', 'lines/s']
+    rows = []
+    for name, result in results.items():
+        row = [name, str(result['lines'])]
+        row += [f"{result['steps'][step] * 1000:.1f}ms" for step in step_names]
+        row += [f"{result['total'] * 1000:.1f}ms", f"{result['lines_per_sec']:,.0f}"]
+        rows.append(row)
+
+    widths = [max(len(row[i]) for row in [header] + rows) for i in range(len(header))]
+    for row in [header] + rows:
+        cells = [row[0].ljust(widths[0])] + [cell.rjust(width) for cell, width in zip(row[1:], widths[1:])]
+        print('  '.join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark mdformat.py on synthetic corpora',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Usage:')[1] if 'Usage:' in __doc__ else '',
+    )
+    parser.add_argument('--lines', type=int, default=50000, help='Lines per corpus (default: 50000)')
+    parser.add_argument(
+        '--corpus', action='append', choices=list(CORPORA), help='Corpus to run, repeatable (default: all)'
+    )
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per corpus, the best is kept (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generators')
+    parser.add_argument('--min-rate', type=float, help='Minimum lines/second for every corpus (overrides the defaults)')
+    parser.add_argument('--baseline', help='JSON results of an earlier --save run to compare against')
+    parser.add_argument(
+        '--max-slowdown', type=float, default=0.25, help='Allowed slowdown against --baseline (default: 0.25)'
+    )
+    parser.add_argument('--save', help='Write the results as JSON to this file')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON instead of a table')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f'Error reading baseline: {e}', file=sys.stderr)
+            sys.exit(1)
+
+    results = run_benchmark(args.corpus or list(CORPORA), args.lines, max(1, args.repeat), args.seed)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    failures = check_thresholds(results, args.min_rate, baseline, args.max_slowdown)
+    for failure in failures:
+        print(f'FAIL {failure}', file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
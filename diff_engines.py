@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Differential test of the mdformat.py engines
+
+Formats every input with the legacy engine (mdformat_legacy.py, the original
+implementation) and with each way the fast engine is used, and reports any
+output that differs, shrunk to a small reproducer, along with how much
+faster the fast engine is. The fast engine is only safe to rely on as long
+as this finds nothing.
+
+Inputs:
+- --corpus: every *.md file under a directory (skipping hidden directories), or a single file
+- --random: generated documents, built from lines that hit the edge cases of every rule
+
+Fast engine paths compared with the legacy output:
+- batch: format_markdown()
+- stream: format_markdown_stream(), as used by --stream
+- blocks: format_markdown_ranges() over all lines, the block splitting that
+  --lines and the parallel formatting of large documents rely on
+
+Usage:
+    python diff_engines.py --random 20000
+    python diff_engines.py --corpus notes/ --corpus export.md
+    python diff_engines.py --corpus notes/ --random 5000 --seed 3 --reproducers mismatches/
+
+Exits with 1 if any output differs.
+"""
+
+import io
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import mdformat
+import mdformat_legacy
+
+
+FAST_PATHS = {
+    'batch': mdformat.format_markdown,
+    'stream': lambda content: ''.join(mdformat.format_markdown_stream(io.StringIO(content))),
+    'blocks': lambda content: mdformat.format_markdown_ranges(content, [(1, content.count('\n') + 1)]),
+}
+
+# Lines the generated documents are made of: list markers with and without
+# content, near-misses of markers, every block kind, continuations and blanks
+PIECES = [
+    '', '', '', '   ', '\t', '- item', '* item', '+ item', '-item', '- ', '-', '1. one', '12) two', '3.x',
+    '# heading', '## heading  ', '#no', '> quote', '>', '```', '```py', 'text', 'more text  ', '*emph*',
+    '    continuation', '\tcontinuation', '  continuation', '\t- tab item',
+]
+
+
+def random_document(rng: random.Random) -> str:
+    lines = []
+    for _ in range(rng.randint(0, 40)):
+        line = rng.choice(PIECES)
+        if line and rng.random() < 0.5:
+            line = ' ' * rng.choice([1, 2, 3, 4, 5, 6, 8, 10, 12]) + line
+        if rng.random() < 0.1:
+            line += ' \t'
+        lines.append(line)
+    return '\n'.join(lines) + rng.choice(['', '\n', '\n\n', '\n\n\n', '  '])
+
+
+def run_safely(function, content: str) -> str:
+    """Run a formatter, turning an exception into an output that can't match a real one."""
+    try:
+        return function(content)
+    except Exception as e:
+        return f'<{type(e).__name__}: {e}>'
+
+
+def minimize(content: str, fails) -> str:
+    """
+    Shrink content while fails(content) stays true: drop runs of lines,
+    halving the run length down to single lines, then drop single characters.
+    """
+    lines = content.split('\n')
+    size = max(1, len(lines) // 2)
+    while True:
+        i = 0
+        removed = False
+        while i < len(lines) and len(lines) > 1:
+            candidate = lines[:i] + lines[i + size:]
+            if fails('\n'.join(candidate)):
+                lines = candidate
+                removed = True
+            else:
+                i += size
+        if size > 1:
+            size //= 2
+        elif not removed:
+            break
+
+    for i in range(len(lines)):
+        j = 0
+        while j < len(lines[i]):
+            candidate = lines[i][:j] + lines[i][j + 1:]
+            if fails('\n'.join(lines[:i] + [candidate] + lines[i + 1:])):
+                lines[i] = candidate
+            else:
+                j += 1
+
+    return '\n'.join(lines)
+
+
+def read_corpus(path: str):
+    """Yield (name, content) for a Markdown file or every one under a directory."""
+    if os.path.isdir(path):
+        names = [os.path.join(path, name) for name in mdformat.find_markdown_files(path)]
+    else:
+        names = [path]
+    for name in names:
+        try:
+            with open(name, 'rb') as f:
+                yield name, f.read().decode('utf-8')
+        except (OSError, UnicodeDecodeError) as e:
+            print(f'Skipping {name}: {e}', file=sys.stderr)
+
+
+def generate_documents(count: int, seed: int):
+    rng = random.Random(seed)
+    for i in range(count):
+        yield f'random #{i} (seed {seed})', random_document(rng)
+
+
+def compare(documents, max_mismatches: int) -> tuple:
+    """
+    Format documents with both engines, returning (stats, mismatches).
+
+    stats has the document and line counts and the time each engine took
+    (the fast one through format_markdown()). mismatches are dicts with the
+    first document name, the fast path that differs and a minimized
+    reproducer, one per distinct reproducer, until max_mismatches of them
+    were found.
+    """
+    stats = {'documents': 0, 'lines': 0, 'legacy_seconds': 0.0, 'fast_seconds': 0.0}
+    mismatches = []
+
+    for name, content in documents:
+        stats['documents'] += 1
+        stats['lines'] += content.count('\n') + 1
+
+        start = time.perf_counter()
+        expected = run_safely(mdformat_legacy.format_markdown, content)
+        stats['legacy_seconds'] += time.perf_counter() - start
+        start = time.perf_counter()
+        outputs = {'batch': run_safely(FAST_PATHS['batch'], content)}
+        stats['fast_seconds'] += time.perf_counter() - start
+
+        for path, function in FAST_PATHS.items():
+            output = outputs[path] if path in outputs else run_safely(function, content)
+            if output == expected or len(mismatches) >= max_mismatches:
+                continue
+
+            def fails(candidate, function=function):
+                return run_safely(function, candidate) != run_safely(mdformat_legacy.format_markdown, candidate)
+
+            reproducer = minimize(content, fails)
+            # Many documents usually shrink to the same few bugs
+            known = [m for m in mismatches if (m['path'], m['reproducer']) == (path, reproducer)]
+            if known:
+                known[0]['documents'] += 1
+                continue
+            mismatches.append({
+                'document': name,
+                'documents': 1,
+                'path': path,
+                'reproducer': reproducer,
+                'legacy': run_safely(mdformat_legacy.format_markdown, reproducer),
+                'fast': run_safely(function, reproducer),
+            })
+
+    return stats, mismatches
+
+
+def print_stats(label: str, stats: dict) -> None:
+    legacy, fast = stats['legacy_seconds'], stats['fast_seconds']
+    speedup = f'{legacy / fast:.1f}x' if fast else 'n/a'
+    print(
+        f"{label}: {stats['documents']:,} documents, {stats['lines']:,} lines, "
+        f'legacy {legacy:.2f}s, fast {fast:.2f}s, speedup {speedup}'
+    )
+
+
+def print_mismatch(number: int, mismatch: dict) -> None:
+    more = f" and {mismatch['documents'] - 1} more" if mismatch['documents'] > 1 else ''
+    print(f"\nMISMATCH {number} in {mismatch['document']}{more} ({mismatch['path']} path)")
+    print(f"  input:  {mismatch['reproducer']!r}")
+    print(f"  legacy: {mismatch['legacy']!r}")
+    print(f"  fast:   {mismatch['fast']!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the output and speed of the mdformat.py engines',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__.split('Usage:')[1] if 'Usage:' in __doc__ else '',
+    )
+    parser.add_argument('--corpus', action='append', default=[], help='Markdown file or directory, repeatable')
+    parser.add_argument('--random', type=int, default=0, metavar='N', help='Number of generated documents')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the generated documents')
+    parser.add_argument(
+        '--max-mismatches', type=int, default=10, help='Stop minimizing after this many mismatches (default: 10)'
+    )
+    parser.add_argument('--reproducers', metavar='DIR', help='Write each minimized reproducer to DIR/mismatch-N.md')
+    args = parser.parse_args()
+
+    if not args.corpus and not args.random:
+        parser.error('nothing to compare, give --corpus and/or --random')
+
+    sources = [(path, read_corpus(path)) for path in args.corpus]
+    if args.random:
+        sources.append((f'random (seed {args.seed})', generate_documents(args.random, args.seed)))
+
+    mismatches = []
+    totals = {'documents': 0, 'lines': 0, 'legacy_seconds': 0.0, 'fast_seconds': 0.0}
+    for label, documents in sources:
+        stats, found = compare(documents, args.max_mismatches - len(mismatches))
+        print_stats(label, stats)
+        mismatches.extend(found)
+        for key in totals:
+            totals[key] += stats[key]
+    if len(sources) > 1:
+        print_stats('total', totals)
+
+    for number, mismatch in enumerate(mismatches, 1):
+        print_mismatch(number, mismatch)
+        if args.reproducers:
+            os.makedirs(args.reproducers, exist_ok=True)
+            with open(os.path.join(args.reproducers, f'mismatch-{number}.md'), 'w', encoding='utf-8', newline='') as f:
+                f.write(mismatch['reproducer'])
+
+    if mismatches:
+        print(f'\n{len(mismatches)} mismatches', file=sys.stderr)
+    else:
+        print('No mismatches')
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -14,17 +14,194 @@ Usage:
     cat input.md | python mdformat.py
     cat input.md | python mdformat.py > output.md
     cat input.md | python mdformat.py - output.md
+    cat huge.md | python mdformat.py --stream > output.md
+    python mdformat.py --in-place input.md
+    python mdformat.py --recursive notes/ --jobs 8 --in-place
+    python mdformat.py --recursive notes/ --check
+    python mdformat.py --staged --in-place
+    python mdformat.py --staged --check
+    python mdformat.py --profile input.md > /dev/null
+    python mdformat.py --profile --profile-format json input.md output.md
+    python mdformat.py --server
+    python mdformat.py --server --socket /tmp/mdformat.sock
+    python mdformat.py --lines 120-180 --in-place journal.md
+    python mdformat.py --git-diff --in-place journal.md
+    python mdformat.py --engine legacy input.md
 
 If no input file is specified or input is '-', reads from stdin.
 If output.md is not specified, the formatted content will be printed to stdout.
+With --stream, the input is formatted as it is read, keeping only a few lines
+in memory; the output is the same. Otherwise a document of several MB is cut
+at block boundaries and the pieces are formatted by --jobs processes, again
+with the same output.
+With --recursive, every *.md file under the directory (skipping hidden
+directories) is formatted in place by a pool of worker processes. Files known
+to be formatted are recorded in DIR/.mdformat-cache and skipped while their
+size and mtime stay the same. --check only reports files that would change,
+and exits with 1 if there are any.
+With --staged, for a pre-commit hook, the *.md files staged in the current git
+repository are formatted as staged: --in-place stages the formatted content
+(and writes it to the working tree unless the file has unstaged changes),
+--check reports files that would change.
+With --lines FIRST-LAST (repeatable) or --git-diff (the lines changed since
+the last commit), only the blocks overlapping those lines are formatted, and
+every other line is left as it is.
+--engine legacy formats with the original implementation in mdformat_legacy.py
+instead (see diff_engines.py to compare the two).
+With --server, the formatter stays loaded and answers line-delimited JSON-RPC
+requests on a Unix socket (--socket, by default the one mdformat_client.py
+connects to), or on stdin/stdout with --socket -. Editors that format on save
+should call mdformat_client.py, which uses the server when it is running and
+formats in-process otherwise.
 """
 
+import os
 import sys
 import re
+import json
+import socket
+import time
+import hashlib
 import argparse
+import resource
+import tempfile
+import subprocess
+import socketserver
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 
 
+# Line kinds, assigned once per line by classify_line()
+BLANK = 0
+TEXT = 1
+FENCE = 2
+HEADING = 3
+QUOTE = 4
+BULLET = 5  # unordered list item
+ORDERED = 6  # ordered list item; kinds >= BULLET are list items
+
+# Kinds that end a paragraph when they follow it
+PARAGRAPH_BREAKERS = frozenset((HEADING, QUOTE, BULLET, ORDERED, FENCE))
+
+ORDERED_MARKER_RE = re.compile(r'\d+[.)]\s')
+
+# Cache of already formatted files, kept in the root of a --recursive run
+CACHE_FILENAME = '.mdformat-cache'
+# Files modified this close to a run are not cached, see format_directory()
+RACY_MTIME_NS = 2 * 10**9
+# Smallest chunk, in characters, a single document is split into for --jobs
+PARALLEL_MIN_CHUNK = 1 << 20
+
+
+def classify_line(line: str) -> tuple:
+    """Classify a line, returning (kind, indent)."""
+    stripped = line.lstrip()
+    if not stripped:
+        return BLANK, 0
+
+    indent = len(line) - len(stripped)
+    first = stripped[0]
+    if first == '#':
+        return HEADING, indent
+    if first == '>':
+        return QUOTE, indent
+    if first in '-*+':
+        # Unordered list markers: -, *, + followed by whitespace
+        return (BULLET if stripped[1:2].isspace() else TEXT), indent
+    if ORDERED_MARKER_RE.match(stripped):
+        # Ordered list markers: number followed by . or )
+        return ORDERED, indent
+    if stripped.startswith('```'):
+        return FENCE, indent
+    return TEXT, indent
+
+
+class LineTable:
+    """
+    Lines of a document together with their classification.
+
+    Kinds and indents are kept in parallel arrays so every formatting rule can
+    work from them instead of re-splitting the text and re-running regexes.
+    Rules build a new table, copying records over for unchanged lines.
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.kinds = array('B')
+        self.indents = array('L')
+
+    @classmethod
+    def from_lines(cls, lines) -> 'LineTable':
+        table = cls()
+        add_line = table.lines.append
+        add_kind = table.kinds.append
+        add_indent = table.indents.append
+        for line in lines:
+            kind, indent = classify_line(line)
+            add_line(line)
+            add_kind(kind)
+            add_indent(indent)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def add(self, line: str, kind: int, indent: int) -> None:
+        self.lines.append(line)
+        self.kinds.append(kind)
+        self.indents.append(indent)
+
+    def copy_from(self, table: 'LineTable', start: int, stop: int) -> None:
+        """Copy the records of table[start:stop] unchanged."""
+        self.lines.extend(table.lines[start:stop])
+        self.kinds.extend(table.kinds[start:stop])
+        self.indents.extend(table.indents[start:stop])
+
+    def text(self) -> str:
+        return '\n'.join(self.lines)
+
+
+class ListStack:
+    """
+    Open list items that a later, shallower item may continue.
+
+    Items are kept by strictly increasing indent, so the nearest previous item
+    at or above a given indentation is always on the stack. This replaces
+    walking backwards over the previous lines for every list item.
+    """
+
+    def __init__(self):
+        self.indents = []
+        self.kinds = []
+
+    def update(self, kind: int, indent: int) -> None:
+        """Account for the next line of the document."""
+        if kind == BLANK:
+            return
+        if kind < BULLET:
+            # Any other block ends the list
+            self.indents.clear()
+            self.kinds.clear()
+            return
+        indents = self.indents
+        while indents and indents[-1] >= indent:
+            indents.pop()
+            self.kinds.pop()
+        indents.append(indent)
+        self.kinds.append(kind)
+
+    def find(self, indent: int) -> tuple:
+        """Return (indent, kind) of the nearest previous item at or above indent, or None."""
+        pos = bisect_right(self.indents, indent) - 1
+        if pos < 0:
+            return None
+        return self.indents[pos], self.kinds[pos]
+
+
 def remove_duplicate_empty_lines(content: str) -> str:
     """Remove consecutive empty lines, allowing only single empty lines."""
     # Replace multiple consecutive empty lines with single empty line
@@ -37,42 +214,80 @@ def remove_trailing_whitespace(content: str) -> str:
     return '\n'.join(line.rstrip() for line in lines)
 
 
+def collapse_empty_lines(table: LineTable) -> LineTable:
+    """
+    Table version of remove_duplicate_empty_lines(), for rstripped lines.
+
+    The regex collapses any stretch of three or more newlines into two, so a
+    run of empty lines inside the document shrinks to one, while a run at the
+    start or end of the document (which has one newline less) keeps two.
+    """
+    kinds = table.kinds
+    n = len(table)
+    result = LineTable()
+    i = 0
+
+    while i < n:
+        if kinds[i] != BLANK:
+            start = i
+            while i < n and kinds[i] != BLANK:
+                i += 1
+            result.copy_from(table, start, i)
+            continue
+
+        run_start = i
+        while i < n and kinds[i] == BLANK:
+            i += 1
+        run = collapsed_run_length(i - run_start, run_start == 0, i == n)
+        for _ in range(run):
+            result.add('', BLANK, 0)
+
+    return result
+
+
+def collapsed_run_length(run: int, at_start: bool, at_end: bool) -> int:
+    """Return how many of a run of empty lines remain after collapsing."""
+    # Count the newlines this run of empty lines spans in the joined text
+    newlines = run + 1 - at_start - at_end
+    if newlines >= 3:
+        run -= newlines - 2
+    return run
+
+
 def format_lists(content: str) -> str:
     """
     Format lists to ensure:
     1. No empty lines between list items at the same level
     2. Sublists are indented by 4 spaces from their parent
     """
-    lines = content.split('\n')
-    result = []
-    i = 0
+    return format_list_lines(LineTable.from_lines(content.split('\n'))).text()
 
-    while i < len(lines):
-        line = lines[i]
 
+def format_list_lines(table: LineTable) -> LineTable:
+    """Table version of format_lists()."""
+    kinds = table.kinds
+    n = len(table)
+    next_non_empty = find_next_non_empty_lines(kinds)
+    result = LineTable()
+    i = 0
+
+    while i < n:
         # Check if current line is a list item
-        if is_list_item(line):
+        if kinds[i] >= BULLET:
             # Process the entire list hierarchy starting from this point
-            list_block, consumed = process_list_hierarchy(lines, i)
-            result.extend(list_block)
-            i += consumed
+            i = process_list_hierarchy(table, i, result, next_non_empty)
         else:
-            result.append(line)
-            i += 1
+            start = i
+            while i < n and kinds[i] < BULLET:
+                i += 1
+            result.copy_from(table, start, i)
 
-    return '\n'.join(result)
+    return result
 
 
 def is_list_item(line: str) -> bool:
     """Check if a line is a list item (ordered or unordered)."""
-    stripped = line.lstrip()
-    # Unordered list markers: -, *, +
-    if re.match(r'^[-*+]\s+', stripped):
-        return True
-    # Ordered list markers: number followed by . or )
-    if re.match(r'^\d+[.)]\s+', stripped):
-        return True
-    return False
+    return classify_line(line)[0] >= BULLET
 
 
 def get_list_indentation(line: str) -> int:
@@ -80,98 +295,98 @@ def get_list_indentation(line: str) -> int:
     return len(line) - len(line.lstrip())
 
 
-def process_list_hierarchy(lines: list, start_idx: int) -> tuple:
+def process_list_hierarchy(table: LineTable, start_idx: int, result: LineTable, next_non_empty: array) -> int:
     """
     Process a complete list hierarchy, fixing indentation and removing empty lines between items.
-    Returns (processed_lines, lines_consumed)
+    Appends the processed lines to result and returns the index after the hierarchy.
     """
-    result = []
+    lines, kinds, indents = table.lines, table.kinds, table.indents
+    n = len(table)
     i = start_idx
 
-    if i >= len(lines) or not is_list_item(lines[i]):
-        return result, 0
+    base_indent = indents[i]
+    depth = 0  # number of nested levels seen, see nested_list_indent()
 
-    base_indent = get_list_indentation(lines[i])
-    indent_levels = [base_indent]  # Track all indentation levels seen
-
-    while i < len(lines):
-        line = lines[i]
+    while i < n:
+        kind = kinds[i]
 
         # Empty line - check if we should keep it
-        if not line.strip():
+        if kind == BLANK:
             # Look ahead to see what comes next
-            next_non_empty_idx = find_next_non_empty_line(lines, i + 1)
+            next_idx = next_non_empty[i]
 
-            if next_non_empty_idx == -1:
+            if next_idx == -1:
                 # End of document
-                result.append(line)
+                result.copy_from(table, i, i + 1)
                 i += 1
                 break
 
-            next_line = lines[next_non_empty_idx]
-
             # If next line is still part of the list hierarchy, skip this empty line
-            if is_list_item(next_line) and get_list_indentation(next_line) >= base_indent:
-                i += 1
-                continue
-            elif next_line.startswith(' ') and get_list_indentation(next_line) > base_indent:
-                # Continuation content
+            if continues_list(base_indent, kinds[next_idx], indents[next_idx], lines[next_idx]):
                 i += 1
                 continue
             else:
                 # Next line is not part of the list, keep the empty line and break
-                result.append(line)
+                result.copy_from(table, i, i + 1)
                 i += 1
                 break
 
         # Non-empty line
-        if is_list_item(line):
-            current_indent = get_list_indentation(line)
+        if kind >= BULLET:
+            current_indent = indents[i]
 
             if current_indent < base_indent:
                 # This list item is at a higher level, stop processing
                 break
             elif current_indent == base_indent:
                 # Same level as base
-                result.append(line)
-                i += 1
+                result.copy_from(table, i, i + 1)
             else:
-                # This is a nested list item - find the correct parent level
-                parent_level = base_indent
-                for level in sorted(indent_levels, reverse=True):
-                    if level < current_indent:
-                        parent_level = level
-                        break
-
-                # Calculate proper indentation (4 spaces from parent)
-                proper_indent = parent_level + 4
-
-                # Add this level to our tracking if it's new
-                if proper_indent not in indent_levels:
-                    indent_levels.append(proper_indent)
-
-                # Create corrected line
-                line_content = line.lstrip()
-                corrected_line = ' ' * proper_indent + line_content
-                result.append(corrected_line)
-                i += 1
-        elif line.startswith(' ') and get_list_indentation(line) > base_indent:
+                # This is a nested list item - fix its indentation
+                proper_indent, depth = nested_list_indent(base_indent, depth, current_indent)
+                result.add(' ' * proper_indent + lines[i][current_indent:], kind, proper_indent)
+            i += 1
+        elif lines[i].startswith(' ') and indents[i] > base_indent:
             # Continuation of list item (indented content) - keep as is
-            result.append(line)
+            result.copy_from(table, i, i + 1)
             i += 1
         else:
             # Not part of the list anymore
             break
 
-    return result, i - start_idx
+    return i
 
 
-def find_next_non_empty_line(lines: list, start_idx: int) -> int:
-    """Find the index of the next non-empty line."""
-    for i in range(start_idx, len(lines)):
-        if lines[i].strip():
-            return i
-    return -1
+def continues_list(base_indent: int, kind: int, indent: int, line: str) -> bool:
+    """Check if the next non-empty line after an empty line is still part of the list hierarchy."""
+    if kind >= BULLET:
+        return indent >= base_indent
+    # Continuation content
+    return line.startswith(' ') and indent > base_indent
+
+
+def nested_list_indent(base_indent: int, depth: int, indent: int) -> tuple:
+    """
+    Return (proper_indent, depth) for a nested list item.
+
+    Known levels are base_indent, base_indent + 4, ... up to base_indent + 4 * depth.
+    The parent is the deepest known level below the item, and the item goes
+    4 spaces from its parent.
+    """
+    level = min(depth, (indent - base_indent - 1) // 4) + 1
+    return base_indent + 4 * level, max(depth, level)
+
+
+def find_next_non_empty_lines(kinds: array) -> array:
+    """For every line, find the index of the next non-empty line after it (-1 if none)."""
+    n = len(kinds)
+    result = array('l', [-1]) * n
+    next_idx = -1
+    for i in range(n - 1, -1, -1):
+        result[i] = next_idx
+        if kinds[i] != BLANK:
+            next_idx = i
+    return result
 
 
 def ensure_block_spacing(content: str) -> str:
@@ -179,158 +394,1051 @@ def ensure_block_spacing(content: str) -> str:
     Ensure there's exactly one empty line after block-level elements
     (headings, paragraphs, lists, blockquotes).
     """
-    lines = content.split('\n')
-    result = []
+    return space_blocks(LineTable.from_lines(content.split('\n'))).text()
+
+
+def space_blocks(table: LineTable) -> LineTable:
+    """Table version of ensure_block_spacing()."""
+    kinds, indents = table.kinds, table.indents
+    n = len(table)
+    next_non_empty = find_next_non_empty_lines(kinds)
+    parents = ListStack()
+    result = LineTable()
+    copied = 0  # lines before this index are already in result
     i = 0
 
-    while i < len(lines):
-        line = lines[i]
-        result.append(line)
+    while i < n:
+        parents.update(kinds[i], indents[i])
 
         # Check if current line is end of a block element
-        if is_end_of_block(line, lines, i):
+        if block_ends_at(table, i, next_non_empty, parents):
             # Look ahead to see if there's already proper spacing
-            next_non_empty_idx = find_next_non_empty_line(lines, i + 1)
+            next_non_empty_idx = next_non_empty[i]
 
             if next_non_empty_idx != -1:  # There's more content after this
                 empty_lines_between = next_non_empty_idx - i - 1
 
-                if empty_lines_between == 0:
-                    # No empty line, add one
-                    result.append('')
-                elif empty_lines_between > 1:
-                    # Too many empty lines, add just one
-                    result.append('')
+                if empty_lines_between != 1:
+                    # No empty line or too many, put exactly one
+                    result.copy_from(table, copied, i + 1)
+                    result.add('', BLANK, 0)
                     # Skip the extra empty lines
+                    copied = next_non_empty_idx
                     i = next_non_empty_idx - 1
-                else:
-                    # Exactly one empty line, keep it as is
-                    pass
 
         i += 1
 
-    return '\n'.join(result)
+    result.copy_from(table, copied, n)
+    return result
 
 
 def is_end_of_block(line: str, lines: list, idx: int) -> bool:
     """Check if the current line is the end of a block-level element."""
-    if not line.strip():
+    table = LineTable.from_lines(lines)
+    parents = ListStack()
+    for i in range(idx + 1):
+        parents.update(table.kinds[i], table.indents[i])
+    return block_ends_at(table, idx, find_next_non_empty_lines(table.kinds), parents)
+
+
+def block_ends_at(table: LineTable, idx: int, next_non_empty: array, parents: ListStack) -> bool:
+    """
+    Table version of is_end_of_block().
+
+    next_non_empty comes from find_next_non_empty_lines(), and parents must
+    have been updated with every line up to and including idx.
+    """
+    kinds, indents = table.kinds, table.indents
+    next_idx = next_non_empty[idx]
+    if next_idx == -1:
+        return ends_block(kinds[idx], indents[idx], None, 0, False, parents)
+    return ends_block(kinds[idx], indents[idx], kinds[next_idx], indents[next_idx], next_idx == idx + 1, parents)
+
+
+def ends_block(kind: int, current_indent: int, next_kind, next_indent: int, adjacent: bool, parents: ListStack) -> bool:
+    """
+    Decide if a line ends a block from its own record and the record of the
+    next non-empty line (next_kind is None at the end of the document).
+    adjacent tells whether that next line directly follows, with no empty line between.
+    """
+    if kind == BLANK:
         return False
 
     # Headings (ATX style)
-    if line.lstrip().startswith('#'):
+    if kind == HEADING:
         return True
 
     # Blockquote end (line starts with > but next doesn't or is empty)
-    if line.lstrip().startswith('>'):
-        next_idx = idx + 1
-        if next_idx >= len(lines):
-            return True
-        next_line = lines[next_idx]
-        if not next_line.strip() or not next_line.lstrip().startswith('>'):
-            return True
+    if kind == QUOTE:
+        return not adjacent or next_kind != QUOTE
 
     # List end - check if this is the last item in a list
-    if is_list_item(line):
-        next_non_empty_idx = find_next_non_empty_line(lines, idx + 1)
-        if next_non_empty_idx == -1:  # End of document
+    if kind >= BULLET:
+        if next_kind is None:  # End of document
             return True
-        next_line = lines[next_non_empty_idx]
-
-        current_indent = get_list_indentation(line)
-        next_indent = get_list_indentation(next_line)
 
-        # If next line is not a list item or continuation, this is end of list
-        if not is_list_item(next_line) and next_indent <= current_indent:
-            return True
+        # If next line is not a list item, this is end of list unless it's a continuation
+        if next_kind < BULLET:
+            return next_indent <= current_indent
         # If next line is a list item but at a lower level, check if it continues a parent list
-        if is_list_item(next_line) and next_indent < current_indent:
-            # Check if the next line is the same type of list (ordered/unordered)
-            next_is_ordered = re.match(r'^\s*\d+[.)]\s+', next_line)
-
-            # Look backwards to see if there's a parent list at the same level as next_line
-            for back_idx in range(idx - 1, -1, -1):
-                back_line = lines[back_idx]
-                if not back_line.strip():
-                    continue
-                if is_list_item(back_line):
-                    back_indent = get_list_indentation(back_line)
-                    # If we find a list item at the same level as next_line
-                    if back_indent == next_indent:
-                        # Check if it's the same type of list
-                        back_is_ordered = re.match(r'^\s*\d+[.)]\s+', back_line)
-                        # Only continue if both are ordered or both are unordered
-                        if (next_is_ordered and back_is_ordered) or (not next_is_ordered and not back_is_ordered):
-                            return False  # Don't add spacing, this is continuing the parent list
-                        else:
-                            return True  # Different list types, add spacing
-                    # Only stop looking if we find a list item at higher level than both current and next
-                    if back_indent < min(current_indent, next_indent):
-                        break
-                else:
-                    # Non-list item, stop looking backwards
-                    break
-            return True
+        if next_indent < current_indent:
+            # Only continue a parent list at the same level as next_line if
+            # both are ordered or both are unordered
+            return parents.find(next_indent) != (next_indent, next_kind)
+        # Different list types at same level, add spacing
+        return next_indent == current_indent and next_kind != kind
 
-        # Check if this is the end of one list type and start of another at same level
-        if is_list_item(next_line) and next_indent == current_indent:
-            # Check if they're different list types
-            current_is_ordered = re.match(r'^\s*\d+[.)]\s+', line)
-            next_is_ordered = re.match(r'^\s*\d+[.)]\s+', next_line)
-
-            if (current_is_ordered and not next_is_ordered) or (not current_is_ordered and next_is_ordered):
-                return True  # Different list types at same level, add spacing
-
-    # Paragraph end (current line has content, next is different block or empty)
-    if (
-        line.strip()
-        and not line.lstrip().startswith('#')
-        and not line.lstrip().startswith('>')
-        and not is_list_item(line)
-    ):
-        next_idx = idx + 1
-        if next_idx >= len(lines):
-            return True
+    # Paragraph end (next non-empty line starts a different block, or there is none)
+    return next_kind is None or next_kind in PARAGRAPH_BREAKERS
 
-        # Look for next non-empty line
-        next_non_empty_idx = find_next_non_empty_line(lines, next_idx)
-        if next_non_empty_idx == -1:
-            return True
 
-        next_line = lines[next_non_empty_idx]
-        # If next line starts a new block type, current line ends a paragraph
-        if (
-            next_line.lstrip().startswith('#')
-            or next_line.lstrip().startswith('>')
-            or is_list_item(next_line)
-            or next_line.strip().startswith('```')
-        ):
-            return True
+def strip_lines(content: str) -> LineTable:
+    """Split the content into lines without trailing whitespace, classifying each line once."""
+    return LineTable.from_lines(line.rstrip() for line in content.split('\n'))
 
-    return False
+
+def finish_document(table: LineTable) -> str:
+    """Remove duplicate empty lines again and join the lines, ending with exactly one newline."""
+    table = collapse_empty_lines(table)
+    lines = table.lines
+    end = len(lines)
+    while end and table.kinds[end - 1] == BLANK:
+        end -= 1
+
+    return '\n'.join(lines[:end]) + '\n'
+
+
+# The steps of format_markdown(), in order. The first takes the content and
+# the last returns it, the others go from LineTable to LineTable.
+FORMAT_STEPS = [
+    # Step 1: Remove trailing whitespace
+    ('trailing_whitespace', strip_lines),
+    # Step 2: Remove duplicate empty lines
+    ('duplicate_empty_lines', collapse_empty_lines),
+    # Step 3: Format lists (remove empty lines between items, fix indentation)
+    ('format_lists', format_list_lines),
+    # Step 4: Ensure proper block spacing
+    ('ensure_block_spacing', space_blocks),
+    # Step 5: Final cleanup - remove duplicate empty lines again, end with exactly one newline
+    ('final_cleanup', finish_document),
+]
 
 
 def format_markdown(content: str) -> str:
     """Apply all formatting rules to the markdown content."""
-    # Step 1: Remove trailing whitespace
-    content = remove_trailing_whitespace(content)
+    for _, step in FORMAT_STEPS:
+        content = step(content)
+    return content
 
-    # Step 2: Remove duplicate empty lines
-    content = remove_duplicate_empty_lines(content)
 
-    # Step 3: Format lists (remove empty lines between items, fix indentation)
-    content = format_lists(content)
+ENGINES = ('fast', 'legacy')
 
-    # Step 4: Ensure proper block spacing
-    content = ensure_block_spacing(content)
 
-    # Step 5: Final cleanup - remove duplicate empty lines again
-    content = remove_duplicate_empty_lines(content)
+def engine_formatter(engine: str):
+    """
+    Return the format_markdown() of an engine: 'fast' is the one in this
+    module, 'legacy' the original implementation in mdformat_legacy.py,
+    which is kept as the reference the fast engine must match.
+    """
+    if engine == 'legacy':
+        import mdformat_legacy
 
-    # Step 6: Ensure document ends with exactly one newline
-    content = content.rstrip() + '\n'
+        return mdformat_legacy.format_markdown
+    if engine != 'fast':
+        raise ValueError(f'unknown engine: {engine}')
+    return format_markdown
+
+
+def split_blocks(table: LineTable) -> list:
+    """
+    Split a document into blocks that format independently of each other,
+    returning their (start, stop) line index ranges.
+
+    A block starts at a line no rule looks past: a heading at column 0, or
+    another column-0 line that follows an empty line and isn't a list item,
+    once there has been a non-empty line. Whatever comes before such a line,
+    format_markdown() puts exactly one empty line in front of it, so
+    formatting the blocks one by one gives the same lines as formatting the
+    whole document.
+    """
+    kinds, indents = table.kinds, table.indents
+    starts = [0]
+    seen_content = False
+    for i, kind in enumerate(kinds):
+        if kind == BLANK:
+            continue
+        if seen_content and indents[i] == 0 and (kind == HEADING or (kind < BULLET and kinds[i - 1] == BLANK)):
+            starts.append(i)
+        seen_content = True
+
+    return list(zip(starts, starts[1:] + [len(kinds)]))
+
+
+def format_markdown_ranges(content: str, ranges) -> str:
+    """
+    Format only the blocks of content overlapping the given line ranges,
+    leaving all other lines as they are.
+
+    ranges are (first, last) line numbers, counting from 1 and inclusive.
+    The blocks that are formatted come out the same as with format_markdown().
+    """
+    lines = content.split('\n')
+    table = strip_lines(content)
+    ranges = sorted(ranges)
+    result = []
+    r = 0
+
+    for start, stop in split_blocks(table):
+        # The block holds lines start + 1 to stop; skip ranges ending before it
+        while r < len(ranges) and ranges[r][1] <= start:
+            r += 1
+        if r < len(ranges) and ranges[r][0] <= stop:
+            # Ends with an empty string, which joins as the empty line before the next block
+            result.extend(format_markdown('\n'.join(table.lines[start:stop])).split('\n'))
+        else:
+            result.extend(lines[start:stop])
+
+    return '\n'.join(result)
+
+
+HUNK_HEADER_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@', re.MULTILINE)
+
+
+def git_changed_ranges(path: str) -> list:
+    """
+    Return the (first, last) line ranges of path that changed since the last
+    commit, according to git. A file git doesn't track yet changed as a whole.
+    Raises OSError if git can't tell, e.g. outside a work tree.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    name = os.path.basename(path)
+    diff = run_git(['diff', '--no-ext-diff', '--no-color', '-U0', 'HEAD', '--', name], cwd=directory)
+
+    ranges = []
+    for match in HUNK_HEADER_RE.finditer(diff.decode('utf-8', 'replace')):
+        first = int(match.group(1))
+        count = int(match.group(2)) if match.group(2) is not None else 1
+        if count:
+            ranges.append((first, first + count - 1))
+        else:
+            # Lines were deleted after line first, touching it and the line after
+            ranges.append((max(first, 1), first + 1))
+
+    if not ranges:
+        tracked = subprocess.run(
+            ['git', 'ls-files', '--error-unmatch', '--', name], cwd=directory, capture_output=True
+        )
+        if tracked.returncode != 0:
+            ranges.append((1, float('inf')))
+    return ranges
+
+
+def next_block_start(content: str, pos: int, first_content: int) -> int:
+    """
+    Return the offset of the first line starting at or after pos that
+    split_blocks() would start a block at, or -1 if there is none.
+    first_content is the offset of the first non-whitespace character.
+    """
+    start = content.rfind('\n', 0, pos) + 1
+    if start < pos:
+        start = content.find('\n', pos) + 1
+        if not start:
+            return -1
+    prev_start = content.rfind('\n', 0, start - 1) + 1
+    prev_blank = start > 0 and not content[prev_start:start - 1].strip()
+
+    while True:
+        end = content.find('\n', start)
+        line = content[start:end].rstrip() if end != -1 else content[start:].rstrip()
+        # A non-empty line at column 0 with some content before it
+        if line and not line[0].isspace() and start > first_content:
+            kind = classify_line(line)[0]
+            if kind == HEADING or (kind < BULLET and prev_blank):
+                return start
+        if end == -1:
+            return -1
+        prev_blank = not line
+        start = end + 1
+
+
+def format_markdown_parallel(content: str, jobs: int, chunk_size: int = None) -> str:
+    """
+    Format content like format_markdown(), in chunks formatted by a pool of jobs processes.
+
+    Chunks are cut at the first block start (see split_blocks()) after every
+    chunk_size characters, and the formatted chunks are joined with the empty
+    line format_markdown() puts before a block, so the result is the same.
+    Content too small for two chunks is formatted in this process.
+    """
+    if chunk_size is None:
+        chunk_size = max(PARALLEL_MIN_CHUNK, len(content) // (jobs * 4))
+    if jobs <= 1 or len(content) < 2 * chunk_size:
+        return format_markdown(content)
+
+    first_content = len(content) - len(content.lstrip())
+    starts = [0]
+    while True:
+        start = next_block_start(content, starts[-1] + chunk_size, first_content)
+        if start == -1:
+            break
+        starts.append(start)
+    if len(starts) == 1:
+        return format_markdown(content)
+
+    chunks = [content[start:stop] for start, stop in zip(starts, starts[1:] + [len(content)])]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as executor:
+        # Every formatted chunk ends with a newline, so this leaves one empty line between them
+        return '\n'.join(executor.map(format_markdown, chunks))
+
+
+def parse_line_range(text: str) -> tuple:
+    """Parse a --lines argument, FIRST-LAST or a single line number."""
+    first, _, last = text.partition('-')
+    try:
+        first = int(first)
+        last = int(last) if last else first
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid line range: {text!r}, expected FIRST-LAST')
+    if first < 1 or last < first:
+        raise argparse.ArgumentTypeError(f'invalid line range: {text!r}')
+    return first, last
+
+
+def profile_format_markdown(content: str) -> tuple:
+    """
+    Run format_markdown() step by step, returning (formatted_content, stats).
+
+    stats has a dict per step with its wall time, how much the peak RSS of
+    the process rose above the RSS at the start of the step, and how many
+    lines it touched (removed, added or rewritten). Measuring memory this way
+    doesn't slow the steps down, unlike tracing allocations.
+    """
+    stats = []
+    result = content
+    before = content.split('\n')
+    for name, step in FORMAT_STEPS:
+        reset_peak_rss()
+        rss_before = current_rss()
+        start = time.perf_counter()
+        result = step(result)
+        elapsed = time.perf_counter() - start
+        peak = peak_rss()
+
+        # The final newline of the document is not a line of its own
+        after = result.lines if isinstance(result, LineTable) else result[:-1].split('\n')
+        stats.append({
+            'step': name,
+            'seconds': elapsed,
+            'peak_memory': max(0, peak - rss_before),
+            'lines_touched': count_lines_touched(before, after),
+            'lines': len(after),
+        })
+        before = after
+
+    return result, stats
+
+
+def read_proc_status(field: str) -> int:
+    """Read a memory field of /proc/self/status in bytes, or -1 where there is no /proc."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return -1
+
+
+def reset_peak_rss() -> None:
+    """Reset the peak RSS of the process, so peak_rss() covers what runs next (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
 
-    return content
+
+def current_rss() -> int:
+    rss = read_proc_status('VmRSS')
+    # Without /proc the best we have is the peak so far
+    return rss if rss >= 0 else peak_rss()
+
+
+def peak_rss() -> int:
+    peak = read_proc_status('VmHWM')
+    if peak >= 0:
+        return peak
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return maxrss if sys.platform == 'darwin' else maxrss * 1024
+
+
+def count_lines_touched(before: list, after: list) -> int:
+    """Count the lines a step removed, added or rewrote (a rewritten line counts once)."""
+    old = Counter(before)
+    new = Counter(after)
+    return max(sum((old - new).values()), sum((new - old).values()))
+
+
+def print_profile(stats: list, output_format: str = 'text', file=None) -> None:
+    """Print the stats of profile_format_markdown() as a table or as JSON."""
+    file = file or sys.stderr
+    total = sum(stat['seconds'] for stat in stats)
+    if output_format == 'json':
+        print(json.dumps({'steps': stats, 'total_seconds': total}, indent=2), file=file)
+        return
+
+    print(f'{"step":<24}{"time":>12}{"peak memory":>14}{"lines touched":>15}{"lines":>10}', file=file)
+    for stat in stats:
+        print(
+            f'{stat["step"]:<24}{stat["seconds"] * 1000:>10.1f}ms{stat["peak_memory"] / 1024 / 1024:>10.1f} MiB'
+            f'{stat["lines_touched"]:>15}{stat["lines"]:>10}',
+            file=file,
+        )
+    print(f'{"total":<24}{total * 1000:>10.1f}ms', file=file)
+
+
+def format_markdown_stream(lines):
+    """
+    Streaming version of format_markdown().
+
+    Takes an iterable of lines as read from a file (with or without their
+    newlines) and yields the formatted output line by line, newline
+    included. Only the lines a rule still has to look past are held in
+    memory, and the output is identical to format_markdown().
+    """
+    records = stream_records(lines)
+    records = stream_collapse_empty_lines(records)
+    records = stream_format_lists(records)
+    records = stream_space_blocks(records)
+    records = stream_collapse_empty_lines(records)
+
+    # Ensure document ends with exactly one newline
+    empty_run = 0
+    empty_document = True
+    for line, kind, _ in records:
+        if kind == BLANK:
+            empty_run += 1
+            continue
+        for _ in range(empty_run):
+            yield '\n'
+        empty_run = 0
+        empty_document = False
+        yield line + '\n'
+
+    if empty_document:
+        yield '\n'
+
+
+def stream_records(lines):
+    """Yield a (line, kind, indent) record per rstripped line, splitting like str.split('\\n')."""
+    ends_with_newline = True  # an empty input is a single empty line
+    for line in lines:
+        ends_with_newline = line.endswith('\n')
+        line = line.rstrip()
+        yield (line,) + classify_line(line)
+    if ends_with_newline:
+        yield '', BLANK, 0
+
+
+def stream_collapse_empty_lines(records):
+    """Streaming version of collapse_empty_lines()."""
+    run = 0
+    at_start = True
+
+    for record in records:
+        if record[1] == BLANK:
+            run += 1
+            continue
+        for _ in range(collapsed_run_length(run, at_start, False)):
+            yield '', BLANK, 0
+        run = 0
+        at_start = False
+        yield record
+
+    for _ in range(collapsed_run_length(run, at_start, True)):
+        yield '', BLANK, 0
+
+
+def stream_format_lists(records):
+    """Streaming version of format_list_lines()."""
+    in_list = False
+    base_indent = 0
+    depth = 0
+    empty_lines = []  # empty lines inside a list, kept until the next line decides their fate
+
+    for record in records:
+        line, kind, indent = record
+
+        if in_list:
+            if kind == BLANK:
+                empty_lines.append(record)
+                continue
+
+            if empty_lines:
+                if continues_list(base_indent, kind, indent, line):
+                    # Still part of the list hierarchy, skip the empty lines
+                    empty_lines.clear()
+                else:
+                    # Not part of the list, keep the empty lines
+                    yield from empty_lines
+                    empty_lines.clear()
+                    in_list = False
+
+        if in_list:
+            if kind >= BULLET:
+                if indent == base_indent:
+                    yield record
+                    continue
+                if indent > base_indent:
+                    proper_indent, depth = nested_list_indent(base_indent, depth, indent)
+                    yield ' ' * proper_indent + line[indent:], kind, proper_indent
+                    continue
+                # This list item is at a higher level, it starts a new list below
+            elif line.startswith(' ') and indent > base_indent:
+                # Continuation of list item (indented content) - keep as is
+                yield record
+                continue
+            in_list = False
+
+        if kind >= BULLET:
+            in_list = True
+            base_indent = indent
+            depth = 0
+        yield record
+
+    # Empty lines at the end of the document are kept
+    yield from empty_lines
+
+
+def stream_space_blocks(records):
+    """Streaming version of space_blocks()."""
+    parents = ListStack()
+    last = None  # last non-empty record, waiting for the next one to decide on spacing
+    empty_lines = []
+
+    for record in records:
+        line, kind, indent = record
+        if kind == BLANK:
+            if last is None:
+                yield record
+            else:
+                empty_lines.append(record)
+            continue
+
+        if last is not None:
+            if len(empty_lines) == 1 or not ends_block(last[1], last[2], kind, indent, not empty_lines, parents):
+                yield from empty_lines
+            else:
+                # No empty line or too many, put exactly one
+                yield '', BLANK, 0
+            empty_lines.clear()
+
+        parents.update(kind, indent)
+        last = record
+        yield record
+
+    yield from empty_lines
+
+
+def stream_markdown(input_name, output_name) -> None:
+    """Format input_name (stdin if None or '-') to output_name (stdout if None) incrementally."""
+    if input_name and input_name != '-':
+        if output_name and Path(output_name).resolve() == Path(input_name).resolve():
+            print('Error: --stream cannot write to its input file', file=sys.stderr)
+            sys.exit(1)
+        try:
+            input_file = open(input_name, encoding='utf-8')
+        except Exception as e:
+            print(f'Error reading input: {e}', file=sys.stderr)
+            sys.exit(1)
+    else:
+        input_file = sys.stdin
+
+    try:
+        if output_name:
+            with open(output_name, 'w', encoding='utf-8') as output_file:
+                output_file.writelines(format_markdown_stream(input_file))
+            print(f'Formatted content written to {output_name}')
+        else:
+            sys.stdout.writelines(format_markdown_stream(input_file))
+    except Exception as e:
+        print(f'Error formatting stream: {e}', file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+
+
+def find_markdown_files(root) -> list:
+    """Find *.md files under root, skipping hidden directories. Returns sorted paths relative to root."""
+    paths = []
+    pending = ['']
+    while pending:
+        rel_dir = pending.pop()
+        with os.scandir(os.path.join(root, rel_dir)) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.'):
+                        pending.append(rel_dir + entry.name + os.sep)
+                elif entry.name.endswith('.md') and entry.is_file():
+                    paths.append(rel_dir + entry.name)
+    paths.sort()
+    return paths
+
+
+def write_atomic(path, content: str) -> None:
+    """Write content to path through a temporary file and a rename."""
+    path = os.path.realpath(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path) + '.')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        try:
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def formatter_version() -> str:
+    """Identify this formatter by a hash of its source, so any change to the rules invalidates caches."""
+    with open(__file__, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:16]
+
+
+def load_cache(root) -> dict:
+    """
+    Load the cache of files known to be formatted under root, mapping each
+    path relative to root to [size, mtime_ns, sha256 of the content].
+    Returns an empty cache if it is missing, unreadable or from another formatter version.
+    """
+    try:
+        with open(os.path.join(root, CACHE_FILENAME), encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != formatter_version():
+        return {}
+    files = data.get('files')
+    return files if isinstance(files, dict) else {}
+
+
+def save_cache(root, files: dict) -> None:
+    data = {'version': formatter_version(), 'files': files}
+    write_atomic(os.path.join(root, CACHE_FILENAME), json.dumps(data, separators=(',', ':')))
+
+
+def format_file_in_place(
+    path: str, known_digest: str = None, write: bool = True, ranges=None, jobs: int = 1, engine: str = 'fast'
+) -> tuple:
+    """
+    Format a file in place, returning (path, changed, error, cache_entry).
+
+    If the content hashes to known_digest it is already formatted and is not parsed again.
+    With write=False the file is only checked. With ranges, only the blocks they overlap
+    are formatted (see format_markdown_ranges()). A large file is split between jobs
+    processes (see format_markdown_parallel()), unless another engine than the fast one
+    formats it. cache_entry is [size, mtime_ns, digest]
+    of the formatted file, or None when it wasn't left formatted.
+    Runs in worker processes, so errors are returned rather than raised.
+    """
+    try:
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        entry = [stat.st_size, stat.st_mtime_ns, digest]
+        if digest == known_digest:
+            return path, False, None, entry
+
+        content = data.decode('utf-8')
+        if ranges is not None:
+            formatted = format_markdown_ranges(content, ranges)
+            # Other blocks may still need formatting, so the file can't be cached as formatted
+            entry = None
+        elif engine == 'fast':
+            formatted = format_markdown_parallel(content, jobs)
+        else:
+            formatted = engine_formatter(engine)(content)
+        if formatted == content:
+            return path, False, None, entry
+        if not write:
+            return path, True, None, None
+
+        write_atomic(path, formatted)
+        if ranges is not None:
+            return path, True, None, None
+        data = formatted.encode('utf-8')
+        stat = os.stat(path)
+        return path, True, None, [stat.st_size, stat.st_mtime_ns, hashlib.sha256(data).hexdigest()]
+    except Exception as e:
+        return path, False, str(e), None
+
+
+def format_files(
+    paths: list, jobs: int, known_digests: list = None, write: bool = True, engine: str = 'fast'
+) -> list:
+    """Format paths in place with a pool of jobs processes, returning format_file_in_place() results."""
+    if known_digests is None:
+        known_digests = [None] * len(paths)
+    writes = [write] * len(paths)
+    format_file = partial(format_file_in_place, engine=engine)
+
+    if jobs <= 1 or len(paths) <= 1:
+        return list(map(format_file, paths, known_digests, writes))
+
+    # Hand out files in batches so small notes don't cost a round trip each
+    chunksize = max(1, len(paths) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(format_file, paths, known_digests, writes, chunksize=chunksize))
+
+
+def format_directory(root, jobs: int, check: bool = False, use_cache: bool = True, engine: str = 'fast') -> int:
+    """
+    Format every Markdown file under root in place, print a report and return the exit code.
+
+    Files whose size and mtime match the cache are skipped without being read.
+    With check=True nothing is written, and the exit code is 1 if any file would change.
+    """
+    start = time.perf_counter()
+    scan_started_ns = time.time_ns()
+    cache = load_cache(root) if use_cache else {}
+    new_cache = {}
+
+    prefix = os.path.join(root, '')
+    paths = []
+    known_digests = []
+    cached = 0
+    for key in find_markdown_files(root):
+        path = prefix + key
+        entry = cache.get(key)
+        if entry:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if [stat.st_size, stat.st_mtime_ns] == entry[:2]:
+                new_cache[key] = entry
+                cached += 1
+                continue
+        paths.append(path)
+        known_digests.append(entry[2] if entry else None)
+
+    results = format_files(paths, jobs, known_digests, write=not check, engine=engine)
+
+    changed = failed = 0
+    for path, is_changed, error, entry in results:
+        if error:
+            failed += 1
+            print(f'Error formatting {path}: {error}', file=sys.stderr)
+            continue
+        if is_changed:
+            changed += 1
+            print(f'Would reformat {path}' if check else f'Formatted {path}')
+        # Files modified just now could change again within the same mtime tick
+        # without us noticing, so they are only cached by a later run
+        if entry and entry[1] < scan_started_ns - RACY_MTIME_NS:
+            new_cache[path[len(prefix):]] = entry
+
+    if use_cache and new_cache != cache:
+        try:
+            save_cache(root, new_cache)
+        except OSError as e:
+            print(f'Error writing cache: {e}', file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    unchanged = cached + len(results) - changed - failed
+    summary = f'{changed} files would change' if check else f'{changed} files changed'
+    summary += f', {unchanged} files unchanged ({cached} cached)'
+    if failed:
+        summary += f', {failed} files failed'
+    print(f'{summary} in {elapsed:.2f}s ({jobs} jobs)')
+    return 1 if failed or (check and changed) else 0
+
+
+def run_git(args: list, cwd=None, input: bytes = None) -> bytes:
+    """Run a git command and return its output, raising OSError with git's message if it fails."""
+    result = subprocess.run(['git', *args], cwd=cwd, input=input, capture_output=True)
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', 'replace').strip()
+        raise OSError(message or f'git {args[0]} failed with exit code {result.returncode}')
+    return result.stdout
+
+
+def staged_markdown_files(root: str) -> list:
+    """List the *.md files staged in the repository at root, as (path, mode, blob_id) with bytes mode and id."""
+    output = run_git(
+        ['diff', '--cached', '--raw', '-z', '--no-renames', '--diff-filter=AMT', '--', '*.md'], cwd=root
+    )
+    # Each file is ":old_mode new_mode old_id new_id status" and its path, NUL-terminated
+    fields = output.split(b'\0')
+    staged = []
+    for i in range(0, len(fields) - 1, 2):
+        _, mode, _, blob_id, _ = fields[i].split(b' ')
+        # Skip symlinks and submodules
+        if mode in (b'100644', b'100755'):
+            staged.append((os.fsdecode(fields[i + 1]), mode, blob_id))
+    return staged
+
+
+def read_blobs(root: str, blob_ids: list) -> list:
+    """Read the content of blobs through a single git cat-file --batch process."""
+    output = run_git(['cat-file', '--batch'], cwd=root, input=b''.join(blob_id + b'\n' for blob_id in blob_ids))
+    blobs = []
+    pos = 0
+    for blob_id in blob_ids:
+        # Each blob is "id type size\n" followed by its content and a newline
+        header_end = output.index(b'\n', pos)
+        header = output[pos:header_end].split(b' ')
+        if len(header) != 3:
+            raise OSError(f'cannot read blob {blob_id.decode()}: {output[pos:header_end].decode()}')
+        start = header_end + 1
+        end = start + int(header[2])
+        blobs.append(output[start:end])
+        pos = end + 1
+    return blobs
+
+
+def format_blob(data: bytes, engine: str = 'fast') -> tuple:
+    """
+    Format the content of a blob, returning (formatted, error).
+    formatted is None when the content is already formatted.
+    Runs in worker processes, so errors are returned rather than raised.
+    """
+    try:
+        content = data.decode('utf-8')
+        formatted = engine_formatter(engine)(content)
+        return (None if formatted == content else formatted), None
+    except Exception as e:
+        return None, str(e)
+
+
+def format_blobs(blobs: list, jobs: int, engine: str = 'fast') -> list:
+    """Format blob contents with a pool of jobs processes, returning format_blob() results."""
+    format_content = partial(format_blob, engine=engine)
+    if jobs <= 1 or len(blobs) <= 1:
+        return list(map(format_content, blobs))
+
+    chunksize = max(1, len(blobs) // (jobs * 8))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(format_content, blobs, chunksize=chunksize))
+
+
+def stage_contents(root: str, files: list) -> None:
+    """Stage new contents for (path, mode, content) files, with one git hash-object and one update-index."""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_paths = []
+        for i, (_, _, content) in enumerate(files):
+            tmp_path = os.path.join(tmp, str(i))
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            tmp_paths.append(tmp_path)
+        # --no-filters: the content is already what the index should hold
+        stdin = ''.join(tmp_path + '\n' for tmp_path in tmp_paths).encode()
+        blob_ids = run_git(['hash-object', '-w', '--no-filters', '--stdin-paths'], cwd=root, input=stdin).split()
+
+    index_info = b''.join(
+        mode + b' ' + blob_id + b'\t' + os.fsencode(path) + b'\0'
+        for (path, mode, _), blob_id in zip(files, blob_ids)
+    )
+    run_git(['update-index', '-z', '--index-info'], cwd=root, input=index_info)
+
+
+def format_staged(jobs: int, check: bool = False, engine: str = 'fast') -> int:
+    """
+    Format the Markdown files staged in the current repository, print a report and return the exit code.
+
+    Staged contents are read through one git cat-file --batch process and formatted
+    by a pool of jobs processes. The formatted contents are staged, and written to
+    the working tree too unless a file has unstaged changes, which are kept.
+    With check=True nothing is written, and the exit code is 1 if any file would change.
+    """
+    start = time.perf_counter()
+    try:
+        root = os.fsdecode(run_git(['rev-parse', '--show-toplevel']).rstrip(b'\n'))
+        staged = staged_markdown_files(root)
+        blobs = read_blobs(root, [blob_id for _, _, blob_id in staged])
+    except OSError as e:
+        print(f'Error reading staged files: {e}', file=sys.stderr)
+        return 1
+
+    results = format_blobs(blobs, jobs, engine)
+
+    updates = []
+    failed = 0
+    for (path, mode, _), data, (formatted, error) in zip(staged, blobs, results):
+        if error:
+            failed += 1
+            print(f'Error formatting {path}: {error}', file=sys.stderr)
+        elif formatted is not None:
+            updates.append((path, mode, formatted, data))
+            if check:
+                print(f'Would reformat {path}')
+
+    if updates and not check:
+        try:
+            stage_contents(root, [(path, mode, formatted) for path, mode, formatted, _ in updates])
+        except OSError as e:
+            print(f'Error staging formatted files: {e}', file=sys.stderr)
+            return 1
+        for path, _, formatted, data in updates:
+            worktree_path = os.path.join(root, path)
+            try:
+                with open(worktree_path, 'rb') as f:
+                    unstaged_changes = f.read() != data
+                if not unstaged_changes:
+                    write_atomic(worktree_path, formatted)
+            except OSError:
+                unstaged_changes = True
+            if unstaged_changes:
+                print(f'Formatted {path} (staged only, the working tree has unstaged changes)')
+            else:
+                print(f'Formatted {path}')
+
+    elapsed = time.perf_counter() - start
+    changed = len(updates)
+    summary = f'{changed} files would change' if check else f'{changed} files changed'
+    summary += f', {len(staged) - changed - failed} files unchanged'
+    if failed:
+        summary += f', {failed} files failed'
+    print(f'{summary} in {elapsed:.2f}s ({jobs} jobs)')
+    return 1 if failed or (check and changed) else 0
+
+
+def default_socket_path() -> str:
+    """Socket of --server when --socket isn't given (mdformat_client.py has a copy of this)."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'mdformat.sock')
+    return os.path.join(os.environ.get('TMPDIR', '/tmp'), f'mdformat-{os.getuid()}.sock')
+
+
+def source_mtime() -> int:
+    return os.stat(__file__).st_mtime_ns
+
+
+def handle_request(line: str, started_mtime: int = None) -> tuple:
+    """
+    Answer one JSON-RPC 2.0 request line, returning (response_line, shutdown).
+
+    Methods:
+    - format, params {"content": str}: the formatted content
+    - ping: {"version": formatter_version()}
+    - shutdown: stops the server after answering
+
+    If mdformat.py changed on disk since started_mtime, every request fails
+    and the server shuts down, so clients fall back to the new rules instead
+    of getting output from the old ones.
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise TypeError
+    except (ValueError, TypeError):
+        return rpc_error(request_id, -32700, 'Parse error'), False
+    request_id = request.get('id')
+
+    if started_mtime is not None and source_mtime() != started_mtime:
+        return rpc_error(request_id, -32000, 'mdformat.py changed since the server started'), True
+
+    method = request.get('method')
+    params = request.get('params') or {}
+    if method == 'format':
+        content = params.get('content') if isinstance(params, dict) else None
+        if not isinstance(content, str):
+            return rpc_error(request_id, -32602, 'params.content must be a string'), False
+        try:
+            return rpc_result(request_id, format_markdown(content)), False
+        except Exception as e:
+            return rpc_error(request_id, -32603, f'Error formatting content: {e}'), False
+    if method == 'ping':
+        return rpc_result(request_id, {'version': formatter_version()}), False
+    if method == 'shutdown':
+        return rpc_result(request_id, None), True
+    return rpc_error(request_id, -32601, f'Unknown method: {method}'), False
+
+
+def rpc_result(request_id, result) -> str:
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'result': result}, ensure_ascii=False)
+
+
+def rpc_error(request_id, code: int, message: str) -> str:
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}})
+
+
+def serve_requests(lines, write, started_mtime: int) -> bool:
+    """Answer request lines until they run out or one asks to shut down, returning whether one did."""
+    for line in lines:
+        if not line.strip():
+            continue
+        response, shutdown = handle_request(line, started_mtime)
+        write(response + '\n')
+        if shutdown:
+            return True
+    return False
+
+
+class FormatRequestHandler(socketserver.StreamRequestHandler):
+    """Serves the requests of one client connection, which may send any number of them."""
+
+    def handle(self):
+        def write(response):
+            self.wfile.write(response.encode('utf-8'))
+            self.wfile.flush()
+
+        lines = (line.decode('utf-8', 'replace') for line in self.rfile)
+        if serve_requests(lines, write, self.server.started_mtime):
+            # Runs in the connection's own thread, so it can wait for serve_forever() to return
+            self.server.shutdown()
+
+
+class FormatServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(path: str) -> None:
+    """Serve formatting requests on a Unix socket until a shutdown request."""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            # Left behind by a server that didn't exit cleanly
+            os.unlink(path)
+        else:
+            raise OSError(f'a server is already listening on {path}')
+        finally:
+            probe.close()
+
+    old_umask = os.umask(0o077)
+    try:
+        server = FormatServer(path, FormatRequestHandler)
+    finally:
+        os.umask(old_umask)
+    server.started_mtime = source_mtime()
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def serve_stdio() -> None:
+    """Serve formatting requests on stdin/stdout until EOF or a shutdown request."""
+    def write(response):
+        sys.stdout.write(response)
+        sys.stdout.flush()
+
+    serve_requests(sys.stdin, write, source_mtime())
 
 
 def main():
@@ -342,9 +1450,137 @@ def main():
     )
     parser.add_argument('input', nargs='?', help='Input Markdown file (optional, defaults to stdin)')
     parser.add_argument('output', nargs='?', help='Output file (optional, defaults to stdout)')
+    parser.add_argument(
+        '--stream', action='store_true', help='Format while reading, keeping only a small window of lines in memory'
+    )
+    parser.add_argument(
+        '--recursive', metavar='DIR', help='Format every *.md file under DIR (requires --in-place or --check)'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of worker processes for --recursive, --staged and single documents of several MB',
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default='fast',
+        help='Formatting engine; legacy is the original, slower implementation (default: fast)',
+    )
+    parser.add_argument(
+        '--staged', action='store_true', help='Format the *.md files staged for commit (requires --in-place or --check)'
+    )
+    parser.add_argument('--in-place', action='store_true', help='Write the formatted content back to the input file')
+    parser.add_argument(
+        '--check', action='store_true', help="Don't write anything, exit with 1 if any file would be reformatted"
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true', help=f'Neither read nor update the {CACHE_FILENAME} file of --recursive'
+    )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Report time, peak memory growth and lines touched for each formatting step on stderr',
+    )
+    parser.add_argument(
+        '--profile-format', choices=['text', 'json'], default='text', help='Output format of --profile (default: text)'
+    )
+    parser.add_argument(
+        '--lines',
+        metavar='FIRST-LAST',
+        action='append',
+        type=parse_line_range,
+        help='Only format the blocks overlapping these lines (repeatable)',
+    )
+    parser.add_argument(
+        '--git-diff', action='store_true', help='Only format the blocks overlapping lines changed since the last commit'
+    )
+    parser.add_argument(
+        '--server', action='store_true', help='Keep running and answer JSON-RPC formatting requests (see --socket)'
+    )
+    parser.add_argument(
+        '--socket', metavar='PATH', help="Unix socket for --server, or '-' for stdin/stdout (default: $XDG_RUNTIME_DIR/mdformat.sock)"
+    )
 
     args = parser.parse_args()
 
+    if args.profile and (args.recursive or args.staged or args.stream or args.in_place or args.check or args.server):
+        parser.error('--profile works on a single document read from a file or stdin')
+
+    if args.engine != 'fast' and (args.stream or args.profile or args.server or args.lines or args.git_diff):
+        parser.error(f'--engine {args.engine} does not support --stream, --profile, --server, --lines or --git-diff')
+
+    ranges = args.lines
+    if ranges or args.git_diff:
+        if args.recursive or args.staged or args.stream or args.profile or args.server:
+            parser.error('--lines and --git-diff work on a single document')
+        if args.git_diff:
+            if ranges:
+                parser.error('--lines and --git-diff are exclusive')
+            if not args.input or args.input == '-':
+                parser.error('--git-diff requires an input file')
+            try:
+                ranges = git_changed_ranges(args.input)
+            except OSError as e:
+                print(f'Error reading changed lines: {e}', file=sys.stderr)
+                sys.exit(1)
+
+    if args.server:
+        if args.input or args.output or args.recursive or args.staged or args.stream or args.in_place or args.check:
+            parser.error('--server does not take input/output files or other modes')
+        if args.socket == '-':
+            serve_stdio()
+            return
+        try:
+            serve_socket(args.socket or default_socket_path())
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f'Error starting server: {e}', file=sys.stderr)
+            sys.exit(1)
+        return
+    if args.socket:
+        parser.error('--socket requires --server')
+
+    if args.recursive:
+        if args.input or args.output or args.stream or args.staged:
+            parser.error('--recursive does not take input/output files, --stream or --staged')
+        if args.in_place == args.check:
+            parser.error('--recursive requires either --in-place or --check')
+        if not os.path.isdir(args.recursive):
+            parser.error(f'not a directory: {args.recursive}')
+        # The cache records files formatted by the fast engine
+        use_cache = not args.no_cache and args.engine == 'fast'
+        sys.exit(format_directory(args.recursive, max(1, args.jobs), args.check, use_cache, args.engine))
+
+    if args.staged:
+        if args.input or args.output or args.stream:
+            parser.error('--staged does not take input/output files or --stream')
+        if args.in_place == args.check:
+            parser.error('--staged requires either --in-place or --check')
+        sys.exit(format_staged(max(1, args.jobs), check=args.check, engine=args.engine))
+
+    if args.in_place or args.check:
+        if args.in_place and args.check:
+            parser.error('--in-place and --check are exclusive')
+        if not args.input or args.input == '-' or args.output or args.stream:
+            parser.error('--in-place and --check take a single input file')
+        _, changed, error, _ = format_file_in_place(
+            args.input, write=args.in_place, ranges=ranges, jobs=max(1, args.jobs), engine=args.engine
+        )
+        if error:
+            print(f'Error formatting {args.input}: {error}', file=sys.stderr)
+            sys.exit(1)
+        if args.check and changed:
+            print(f'Would reformat {args.input}')
+            sys.exit(1)
+        return
+
+    if args.stream:
+        stream_markdown(args.input, args.output)
+        return
+
     # Read input
     try:
         if args.input and args.input != '-':
@@ -359,7 +1595,15 @@ def main():
         sys.exit(1)
 
     # Format the content
-    formatted_content = format_markdown(content)
+    if args.profile:
+        formatted_content, stats = profile_format_markdown(content)
+        print_profile(stats, args.profile_format)
+    elif ranges is not None:
+        formatted_content = format_markdown_ranges(content, ranges)
+    elif args.engine == 'fast':
+        formatted_content = format_markdown_parallel(content, max(1, args.jobs))
+    else:
+        formatted_content = engine_formatter(args.engine)(content)
 
     # Write output
     if args.output:
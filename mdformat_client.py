@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Thin client for the mdformat.py server, for editors that format on save.
+
+Sends the document to a running `mdformat.py --server` and prints the
+formatted content. If no server is listening (or it fails), formats
+in-process by importing mdformat.py instead, so the output is the same
+either way; only the latency differs. Only the standard library modules
+needed to talk to the server are imported up front, and there is no
+argparse, to keep startup short.
+
+Usage:
+    python mdformat_client.py input.md [output.md]
+    cat input.md | python mdformat_client.py > output.md
+    python mdformat_client.py --socket /tmp/mdformat.sock input.md
+
+Start the server with:
+    python mdformat.py --server
+"""
+
+import os
+import sys
+import json
+import socket
+
+# How long to wait for the server before formatting in-process
+TIMEOUT = 5.0
+
+
+class ServerError(Exception):
+    """The server answered a request with an error."""
+
+
+def default_socket_path() -> str:
+    """Same as mdformat.default_socket_path(), copied to avoid importing mdformat.py."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'mdformat.sock')
+    return os.path.join(os.environ.get('TMPDIR', '/tmp'), f'mdformat-{os.getuid()}.sock')
+
+
+def format_with_server(content: str, path: str, timeout: float = TIMEOUT) -> str:
+    """Format content with the server listening on path, raising OSError or ServerError on failure."""
+    request = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'format', 'params': {'content': content}})
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(request.encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+
+    try:
+        response = json.loads(line)
+    except ValueError:
+        raise ServerError('invalid response')
+    if not isinstance(response, dict) or not isinstance(response.get('result'), str):
+        error = response.get('error') if isinstance(response, dict) else None
+        raise ServerError(error.get('message', 'unknown error') if isinstance(error, dict) else 'invalid response')
+    return response['result']
+
+
+def format_content(content: str, path: str = None) -> str:
+    """Format content with the server if it's running, in-process otherwise."""
+    try:
+        return format_with_server(content, path or default_socket_path())
+    except (OSError, ServerError):
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import mdformat
+
+        return mdformat.format_markdown(content)
+
+
+def main():
+    args = sys.argv[1:]
+    if '-h' in args or '--help' in args:
+        print(__doc__.strip())
+        return
+
+    path = None
+    if '--socket' in args:
+        idx = args.index('--socket')
+        if idx + 1 >= len(args):
+            print('Error: --socket requires a path', file=sys.stderr)
+            sys.exit(2)
+        path = args[idx + 1]
+        del args[idx:idx + 2]
+    if len(args) > 2:
+        print('Error: expected at most an input and an output file', file=sys.stderr)
+        sys.exit(2)
+    input_name = args[0] if args else None
+    output_name = args[1] if len(args) > 1 else None
+
+    try:
+        if input_name and input_name != '-':
+            with open(input_name, encoding='utf-8') as f:
+                content = f.read()
+        else:
+            content = sys.stdin.read()
+    except Exception as e:
+        print(f'Error reading input: {e}', file=sys.stderr)
+        sys.exit(1)
+
+    formatted_content = format_content(content, path)
+
+    if output_name:
+        try:
+            with open(output_name, 'w', encoding='utf-8') as f:
+                f.write(formatted_content)
+        except Exception as e:
+            print(f'Error writing output file: {e}', file=sys.stderr)
+            sys.exit(1)
+    else:
+        print(formatted_content, end='')
+
+
+if __name__ == '__main__':
+    main()
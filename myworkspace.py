@@ -5,11 +5,27 @@
 # dependencies = []
 # ///
 
+from __future__ import annotations
+
 import os
+import sys
+import re
+import json
+import time
+import signal
+import socket
+import struct
+import hashlib
+import argparse
+import threading
 import subprocess
+import socketserver
 import shutil
 from collections import OrderedDict
 from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from enum import Enum
 
@@ -29,6 +45,22 @@ class Colors:
 class Options:
     items_per_line = 3
     tab = 1
+    # Repos scanned at once; each scan mostly waits on git subprocesses
+    jobs = min(32, (os.cpu_count() or 1) * 4)
+    # Statuses of the last scan, reused with --cache for repos where nothing changed since. Off by
+    # default: telling that nothing changed walks the worktree, which takes about as long as git status
+    cache_path = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache', 'myworkspace', 'status.json')
+    use_cache = False
+    # Directory levels looked down for repos, 1 being the directories of the current directory
+    depth = 1
+    # Run as the workspace server, or ask the one listening on socket_path before scanning
+    server = False
+    use_server = True
+    socket_path = ''
+    # Seconds between the server's refreshes of the workspaces it was asked about
+    refresh_interval = 10.0
+    # Slowest repos to show the timings of after the statuses, 0 to not time the scan
+    timings = 0
 
 
 class SyncStatus(Enum):
@@ -64,14 +96,295 @@ def get_node_type(name: str) -> str:
         raise TypeError(f'Unknown file type: {name}, {path.stat()}')
 
 
-@contextmanager
-def cdctx(path: str):
-    old_cwd = os.getcwd()
-    os.chdir(path)
+# Section header of a git config file: [section], [section "subsection"] or the deprecated [section.subsection]
+CONFIG_SECTION_RE = re.compile(r'\[\s*([A-Za-z0-9.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+OID_RE = re.compile(r'[0-9a-f]{40}(?:[0-9a-f]{24})?')
+
+
+def read_git_config(path: Path) -> dict[tuple[str, str, str], list[str]]:
+    """
+    Read the values of a repository's config file, keyed by (section, subsection, key).
+    Raises ValueError for what this simple reader can't follow, like includes.
+    """
+    config: dict[tuple[str, str, str], list[str]] = {}
+    section = subsection = ''
+    for line in path.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line[0] in '#;':
+            continue
+        if line.startswith('['):
+            match = CONFIG_SECTION_RE.match(line)
+            if not match:
+                raise ValueError(f'unsupported config line: {line}')
+            section = match.group(1).lower()
+            subsection = (match.group(2) or '').replace('\\"', '"').replace('\\\\', '\\')
+            if '.' in section and match.group(2) is None:
+                # Old syntax, where git lowercases the subsection too
+                section, _, subsection = section.partition('.')
+            if section in ('include', 'includeif'):
+                raise ValueError('config includes other files')
+            continue
+        key, _, value = line.partition('=')
+        value = value.strip()
+        if len(value) > 1 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        config.setdefault((section, subsection, key.strip().lower()), []).append(value)
+    return config
+
+
+def upstream_tracking_ref(config: dict, branch: str) -> str | None:
+    """Map a branch's upstream (branch.<name>.remote and .merge) to the ref it is fetched into."""
+    remote = config.get(('branch', branch, 'remote'), [None])[-1]
+    merge = config.get(('branch', branch, 'merge'), [None])[-1]
+    if not remote or not merge:
+        return None
+    if remote == '.':
+        return merge
+    for refspec in config.get(('remote', remote, 'fetch'), []):
+        src, _, dst = refspec.lstrip('+').partition(':')
+        if src.startswith('^') or not dst:
+            continue
+        if '*' in src:
+            prefix, _, suffix = src.partition('*')
+            if merge.startswith(prefix) and merge.endswith(suffix) and len(merge) >= len(prefix) + len(suffix):
+                return dst.replace('*', merge[len(prefix):len(merge) - len(suffix)], 1)
+        elif src == merge:
+            return dst
+    raise ValueError(f'no fetch refspec of {remote} matches {merge}')
+
+
+def read_branch_refs(repo: str) -> tuple[dict[str, str], str | None] | None:
+    """
+    Read the branch, HEAD and upstream tips of repo straight from its .git
+    directory, without running git: (branch, upstream_oid), where branch has
+    the same keys as the `# branch.*` lines of `git status --porcelain=v2
+    --branch` (oid, head and, if there is one, upstream) and upstream_oid is
+    None if the upstream ref is gone.
+
+    Returns None when git has to be asked instead: linked worktrees and
+    submodules (.git is a file), reftable repositories, config includes,
+    symbolic refs and unborn branches.
+    """
+    git_path = Path(repo, '.git')
+    packed = None
+
+    def resolve(ref: str) -> str | None:
+        nonlocal packed
+        try:
+            value = git_path.joinpath(ref).read_text(encoding='utf-8').strip()
+        except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+            # Not a loose ref, look in packed-refs
+            if packed is None:
+                packed = {}
+                try:
+                    for line in git_path.joinpath('packed-refs').read_text(encoding='utf-8').splitlines():
+                        if line and line[0] not in '#^':
+                            oid, _, name = line.partition(' ')
+                            packed[name] = oid
+                except FileNotFoundError:
+                    pass
+            return packed.get(ref)
+        if not OID_RE.fullmatch(value):
+            raise ValueError(f'{ref} is not a plain ref')
+        return value
+
     try:
-        yield
-    finally:
-        os.chdir(old_cwd)
+        if not git_path.is_dir():
+            return None
+        head = git_path.joinpath('HEAD').read_text(encoding='utf-8').strip()
+        if not head.startswith('ref: '):
+            # Detached HEAD, no upstream
+            return {'oid': head, 'head': '(detached)'}, None
+
+        config = read_git_config(git_path / 'config')
+        if ('extensions', '', 'refstorage') in config:
+            return None
+        head_ref = head[len('ref: '):]
+        oid = resolve(head_ref)
+        if oid is None or not head_ref.startswith('refs/heads/'):
+            return None
+        branch = {'oid': oid, 'head': head_ref[len('refs/heads/'):]}
+
+        upstream_ref = upstream_tracking_ref(config, branch['head'])
+        if upstream_ref is None:
+            return branch, None
+        # Shortened like git shows it: origin/main
+        for prefix in ('refs/heads/', 'refs/remotes/'):
+            if upstream_ref.startswith(prefix):
+                branch['upstream'] = upstream_ref[len(prefix):]
+                break
+        else:
+            branch['upstream'] = upstream_ref
+        return branch, resolve(upstream_ref)
+    except (OSError, UnicodeDecodeError, ValueError):
+        return None
+
+
+def read_index_paths(index_path: Path) -> list[bytes]:
+    """Read the paths of the entries in a git index file (versions 2 to 4, SHA-1 repos)."""
+    data = index_path.read_bytes()
+    if data[:4] != b'DIRC':
+        raise ValueError(f'{index_path} is not a git index')
+    version, count = struct.unpack_from('>II', data, 4)
+    if version not in (2, 3, 4):
+        raise ValueError(f'unsupported index version {version}')
+
+    paths = []
+    path = b''
+    pos = 12
+    for _ in range(count):
+        start = pos
+        # 40 bytes of stat data, the 20 byte object id, then the flags
+        flags, = struct.unpack_from('>H', data, pos + 60)
+        pos += 62
+        if flags & 0x4000 and version >= 3:
+            pos += 2
+        if version == 4:
+            # Path stored as: how much to strip from the previous one, then the rest
+            byte = data[pos]
+            pos += 1
+            strip = byte & 0x7f
+            while byte & 0x80:
+                byte = data[pos]
+                pos += 1
+                strip = ((strip + 1) << 7) | (byte & 0x7f)
+            end = data.index(b'\0', pos)
+            path = path[:len(path) - strip] + data[pos:end]
+            pos = end + 1
+        else:
+            end = data.index(b'\0', pos)
+            path = data[pos:end]
+            # Entries are NUL padded to a multiple of 8 bytes
+            pos = start + ((end - start + 8) & ~7)
+        paths.append(path)
+    return paths
+
+
+@lru_cache(maxsize=None)
+def scoped_config_value(scope: str, name: str) -> str | None:
+    """Ask git for the value of name in the --system or --global config, once per process."""
+    result = subprocess.run(['git', 'config', f'--{scope}', '--get', name], capture_output=True, text=True)
+    return result.stdout.strip() or None
+
+
+def user_git_files(config: dict) -> list[str]:
+    """
+    The files outside a repo that git status reads: the system and global
+    config files, and the excludes file set by these or by the repo's config
+    (core.excludesFile, git/ignore under XDG_CONFIG_HOME by default).
+    """
+    config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(Path.home(), '.config')
+    scopes = [
+        ('system', '/etc/gitconfig'),
+        ('global', os.path.join(config_home, 'git', 'config')),
+        ('global', os.path.join(Path.home(), '.gitconfig')),
+    ]
+    excludes = os.path.join(config_home, 'git', 'ignore')
+    # Later files win, the repo's config last
+    for scope, path in scopes:
+        try:
+            values = read_git_config(Path(path)).get(('core', '', 'excludesfile'))
+        except (OSError, UnicodeDecodeError):
+            continue
+        except ValueError:
+            # Includes other files, git follows them
+            values = [scoped_config_value(scope, 'core.excludesFile')]
+        if values and values[-1]:
+            excludes = values[-1]
+    if config.get(('core', '', 'excludesfile')):
+        excludes = config[('core', '', 'excludesfile')][-1]
+    return [path for _, path in scopes] + [os.path.expanduser(excludes)]
+
+
+def status_key(repo: str, ignored: list[str]) -> str | None:
+    """
+    Fingerprint everything git status looks at in repo: the stat data of
+    HEAD, config, index, packed-refs, the merge and rebase state and every
+    refs/ directory (ref updates are renames into one of these), of the
+    config and excludes files of user_git_files(), of every file in the
+    index and every .gitignore, and of every directory git looks for untracked files in: all of
+    the worktree but nested repos and the ignored directories, as listed by
+    the last `git status --ignored=matching` (relative, with a trailing /).
+    Not the .git directory itself, where git status creates and removes
+    index.lock on every run. The status can only differ from the one
+    recorded under the same key if one of these changed, or a file was
+    rewritten within the timestamp granularity of the filesystem.
+
+    Returns None for repos this can't be done for: linked worktrees and
+    submodules (.git is a file), split indexes and SHA-256 repos.
+    """
+    git_path = Path(repo, '.git')
+    digest = hashlib.blake2b(digest_size=16)
+
+    def add(path) -> None:
+        try:
+            st = os.lstat(path)
+            digest.update(b'%d %d %d %d;' % (st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino))
+        except OSError:
+            digest.update(b'-;')
+
+    try:
+        if not git_path.is_dir() or any(name.startswith('sharedindex.') for name in os.listdir(git_path)):
+            return None
+        config = read_git_config(git_path / 'config')
+        if ('extensions', '', 'objectformat') in config:
+            return None
+        for name in ('HEAD', 'config', 'index', 'packed-refs', 'info/exclude',
+                     'MERGE_HEAD', 'rebase-merge', 'rebase-apply'):
+            add(git_path / name)
+        for dirpath, _, _ in sorted(os.walk(git_path / 'refs')):
+            add(dirpath)
+        for path in user_git_files(config):
+            add(path)
+
+        root = os.fsencode(repo)
+        dirs = {b''}
+        for path in read_index_paths(git_path / 'index'):
+            add(root + b'/' + path)
+            dirs.add(path.rpartition(b'/')[0])
+
+        # Quoted paths (with special characters) are walked, the key only
+        # changes more often for them
+        skipped = {os.fsencode(path.rstrip('/')) for path in ignored if not path.startswith('"')}
+        skipped.add(b'.git')
+        for dirpath, dirnames, filenames in os.walk(root):
+            path = os.path.relpath(dirpath, root) if dirpath != root else b''
+            if path and (b'.git' in dirnames or b'.git' in filenames):
+                # Nested repo, git doesn't look into it
+                dirnames.clear()
+                continue
+            dirs.add(path)
+            if b'.gitignore' in filenames:
+                add(os.path.join(dirpath, b'.gitignore'))
+            dirnames[:] = [name for name in dirnames if os.path.join(path, name) not in skipped]
+        for path in sorted(dirs):
+            add(root + b'/' + path)
+    except (OSError, UnicodeDecodeError, ValueError, struct.error, IndexError):
+        # Including repos without an index yet
+        return None
+    return digest.hexdigest()
+
+
+def load_status_cache(path: Path) -> dict[str, dict]:
+    """Read the statuses saved by the last scan, keyed by absolute repo path."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('repos', {}) if isinstance(cache, dict) and cache.get('version') == 1 else {}
+
+
+def save_status_cache(path: Path, repos: dict[str, dict]) -> None:
+    """Write the cache atomically, so concurrent runs never read half of it."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'repos': repos}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
 
 
 class GitDir:
@@ -79,89 +392,122 @@ class GitDir:
         self.name = name
         self.sync_status: SyncStatus | None = None
         self.working_dir_status: WorkingDirStatus | None = None
-
-    def analyze_status(self) -> None:
-        with cdctx(self.name):
-            if not Path('.git').exists():
-                raise ValueError(f'{self.name} is not a git repository')
-
-            self._check_sync_status()
-            self._check_working_dir_status()
-
-    def _check_sync_status(self) -> None:
+        self.ahead_behind: tuple[int, int] = (0, 0)
+        # Ignored directories git didn't look into, which status_key() skips too
+        self.ignored_dirs: list[str] = []
+        # Seconds spent in each step of the last scan, in the order they ran
+        self.timings: dict[str, float] = {}
+        self.cached = False
+
+    @contextmanager
+    def timed(self, step: str):
+        """Add the time spent in the with block to the timing of step"""
+        start = time.perf_counter()
         try:
-            # Check if we have a tracking remote
-            result = subprocess.run(
-                ['git', 'rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{u}'],
-                capture_output=True,
-                text=True,
-                check=False
-            )
-
-            if result.returncode != 0:
-                # No tracking remote, consider it sync
-                self.sync_status = SyncStatus.SYNC
-                return
-
-            # Check if local is ahead or behind remote
-            result = subprocess.run(
-                ['git', 'rev-list', '--left-right', '--count', 'HEAD...@{u}'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            ahead, behind = map(int, result.stdout.strip().split())
-            if ahead == 0 and behind == 0:
-                self.sync_status = SyncStatus.SYNC
-            else:
-                self.sync_status = SyncStatus.OUT_OF_SYNC
+            yield
+        finally:
+            self.timings[step] = self.timings.get(step, 0.0) + time.perf_counter() - start
+
+    @property
+    def scan_time(self) -> float:
+        return sum(self.timings.values())
+
+    def analyze_status(self, list_ignored: bool = False) -> None:
+        """
+        Run git status in the repo and set the statuses from it. With
+        list_ignored, also set ignored_dirs, which the status cache needs.
+        """
+        # Safe to run from several threads at once: git runs with -C instead of a chdir
+        if not Path(self.name, '.git').exists():
+            raise ValueError(f'{self.name} is not a git repository')
+        self.timings = {}
+        self.cached = False
+
+        # When the refs show HEAD is at its upstream tip (or there is no
+        # upstream), git only needs to look at the files, not count commits
+        with self.timed('read refs'):
+            refs = read_branch_refs(self.name)
+        args = ['git', '-C', self.name, 'status', '--porcelain=v2']
+        if list_ignored:
+            args.append('--ignored=matching')
+        if refs is None or refs[1] not in (None, refs[0]['oid']):
+            # The tips differ, have git count how far apart they are
+            refs = None
+            args.append('--branch')
 
+        try:
+            with self.timed(' '.join(args[:1] + args[3:])):
+                result = subprocess.run(args, capture_output=True, text=True, check=True)
         except subprocess.CalledProcessError:
-            # If any git command fails, consider it out of sync
+            # If git fails, consider it out of sync and dirty
+            self.sync_status = SyncStatus.OUT_OF_SYNC
+            self.working_dir_status = WorkingDirStatus.DIRTY
+            self.ignored_dirs = []
+            return
+
+        with self.timed('parse'):
+            self._parse_status(result.stdout, refs)
+
+    def _parse_status(self, output: str, refs: tuple[dict[str, str], str | None] | None = None) -> None:
+        """
+        Set the statuses from the output of `git status --porcelain=v2
+        [--ignored=matching] [--branch]`. refs are the in-sync refs read by
+        read_branch_refs() when git ran without --branch, for subclasses
+        showing the branch.
+        """
+        ahead_behind = None
+        has_uncommitted = False
+        has_untracked = False
+        self.ignored_dirs = []
+
+        for line in output.splitlines():
+            if line.startswith('# branch.ab '):
+                # "# branch.ab +<ahead> -<behind>", only there if the upstream exists
+                ahead, behind = line.split()[2:4]
+                ahead_behind = (int(ahead), -int(behind))
+            elif line.startswith('? '):
+                has_untracked = True
+            elif line.startswith('! ') and line.endswith('/'):
+                self.ignored_dirs.append(line[2:])
+            elif line[:2] in ('1 ', '2 ', 'u '):
+                # Changed, renamed or unmerged tracked file
+                has_uncommitted = True
+
+        # No tracking remote (or it's gone), consider it sync
+        self.ahead_behind = ahead_behind or (0, 0)
+        if self.ahead_behind == (0, 0):
+            self.sync_status = SyncStatus.SYNC
+        else:
             self.sync_status = SyncStatus.OUT_OF_SYNC
 
-    def _check_working_dir_status(self) -> None:
-        try:
-            # Check for uncommitted changes and conflicts
-            result = subprocess.run(
-                ['git', 'status', '--porcelain'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-
-            status_lines = result.stdout.strip().split('\n') if result.stdout.strip() else []
-
-            # Check for merge/rebase in progress
-            if (Path('.git/MERGE_HEAD').exists() or
-                Path('.git/rebase-merge').exists() or
-                Path('.git/rebase-apply').exists()):
-                self.working_dir_status = WorkingDirStatus.DIRTY
-                return
-
-            if not status_lines:
-                self.working_dir_status = WorkingDirStatus.CLEAN
-                return
-
-            has_uncommitted = False
-            has_untracked = False
-
-            for line in status_lines:
-                if line.startswith('??'):
-                    has_untracked = True
-                else:
-                    has_uncommitted = True
-
-            if has_uncommitted:
-                self.working_dir_status = WorkingDirStatus.DIRTY
-            elif has_untracked:
-                self.working_dir_status = WorkingDirStatus.UNTRACKED
-            else:
-                self.working_dir_status = WorkingDirStatus.CLEAN
-
-        except subprocess.CalledProcessError:
+        # Check for merge/rebase in progress
+        git_path = Path(self.name, '.git')
+        if (git_path.joinpath('MERGE_HEAD').exists() or
+            git_path.joinpath('rebase-merge').exists() or
+            git_path.joinpath('rebase-apply').exists()):
+            self.working_dir_status = WorkingDirStatus.DIRTY
+        elif has_uncommitted:
             self.working_dir_status = WorkingDirStatus.DIRTY
+        elif has_untracked:
+            self.working_dir_status = WorkingDirStatus.UNTRACKED
+        else:
+            self.working_dir_status = WorkingDirStatus.CLEAN
+
+    def cache_entry(self, key: str | None = None) -> dict:
+        """The statuses as stored in the status cache under key, or as sent by the server without one"""
+        entry = {
+            'sync': self.sync_status.value,
+            'working': self.working_dir_status.value,
+            'ahead_behind': list(self.ahead_behind),
+        }
+        if key:
+            entry['key'] = key
+        return entry
+
+    def load_cache_entry(self, entry: dict) -> None:
+        self.sync_status = SyncStatus(entry['sync'])
+        self.working_dir_status = WorkingDirStatus(entry['working'])
+        self.ahead_behind = tuple(entry['ahead_behind'])
 
     def __str__(self) -> str:
         sync = self.sync_status.value if self.sync_status else 'unknown'
@@ -177,25 +523,454 @@ class RegularDir:
         return f'<RegularDir {self.name}>'
 
 
-def list_dirs() -> tuple[list[GitDir], list[RegularDir]]:
-    git_dirs = []
-    regular_dirs = []
+# Never looked into for repos: dependencies and build output, often huge and never holding checkouts
+PRUNED_DIRS = {'node_modules', '.venv', 'venv', 'target', '__pycache__', '.tox'}
 
+
+def list_subdirs(root: str, path: str = '') -> list[str]:
+    """Subdirectories of root/path, as paths relative to root"""
     try:
-        for item in os.listdir('.'):
-            if item.strip() and Path(item).is_dir():
-                if Path(item, '.git').exists():
-                    git_dir = GitDir(item)
-                    git_dir.analyze_status()
-                    git_dirs.append(git_dir)
-                else:
-                    regular_dirs.append(RegularDir(item))
+        with os.scandir(os.path.join(root, path)) as entries:
+            return [os.path.join(path, entry.name) for entry in entries if entry.name.strip() and entry.is_dir()]
     except OSError:
+        return []
+
+
+def find_dirs(depth: int = Options.depth, jobs: int = Options.jobs, root: str = '.') -> tuple[list[str], list[str]]:
+    """
+    Find the git repos in directory root and its subdirectories, depth levels
+    down at most. Repos and symlinks aren't looked into, and hidden
+    directories and PRUNED_DIRS are skipped, only listed at the top level.
+    Returns the sorted paths, relative to root, of the repos and of the
+    regular directories, which are the topmost directories with no repo under
+    them.
+
+    Each level is listed by up to jobs threads at once, os.scandir() releasing
+    the GIL while it waits on the filesystem.
+    """
+
+    def skipped(path: str) -> bool:
+        name = os.path.basename(path)
+        return name.startswith('.') or name in PRUNED_DIRS
+
+    def visit(path: str, level: int) -> tuple[bool, list[str]]:
+        if os.path.exists(os.path.join(root, path, '.git')):
+            return True, []
+        if level >= depth or skipped(path) or os.path.islink(os.path.join(root, path)):
+            return False, []
+        return False, [subdir for subdir in list_subdirs(root, path) if not skipped(subdir)]
+
+    repos = []
+    dirs = []
+    parents: dict[str, str | None] = {}
+    # Directories with a repo somewhere under them
+    has_repo: set[str] = set()
+
+    paths = list_subdirs(root)
+    parents.update(dict.fromkeys(paths))
+    level = 1
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        while paths:
+            next_paths = []
+            for path, (is_repo, subdirs) in zip(paths, executor.map(visit, paths, repeat(level))):
+                if is_repo:
+                    repos.append(path)
+                    parent = parents[path]
+                    while parent is not None and parent not in has_repo:
+                        has_repo.add(parent)
+                        parent = parents[parent]
+                else:
+                    dirs.append(path)
+                    parents.update(dict.fromkeys(subdirs, path))
+                    next_paths += subdirs
+            paths = next_paths
+            level += 1
+
+    regular = [path for path in dirs if path not in has_repo and (parents[path] is None or parents[path] in has_repo)]
+    # Sorted, so each status group lists its repos in the same order every run
+    return sorted(repos), sorted(regular)
+
+
+def scan_repo(git_dir, cache: dict[str, dict] | None = None) -> None:
+    """
+    Set the statuses of git_dir, from cache (as loaded by load_status_cache())
+    if its status_key() is the one cached there, caching them otherwise.
+    git_dir can be any object with the scanning and cache methods of GitDir,
+    like the GitDir of myws-tui.py.
+    """
+    if cache is None:
+        git_dir.analyze_status()
+        return
+    path = os.path.abspath(git_dir.name)
+    entry = cache.get(path)
+    start = time.perf_counter()
+    # Keyed before the scan: a change made while git status runs then shows
+    # in the next key, and so does git status refreshing the index, which
+    # only costs one more scan. Not keyed at all before the first scan has
+    # listed the ignored directories, which may be huge.
+    key = None
+    if isinstance(entry, dict) and isinstance(entry.get('ignored'), list):
+        key = status_key(git_dir.name, entry['ignored'])
+    key_time = time.perf_counter() - start
+    try:
+        if key and entry['key'] == key:
+            git_dir.load_cache_entry(entry)
+            git_dir.ignored_dirs = entry['ignored']
+            git_dir.timings = {'status key': key_time}
+            git_dir.cached = True
+            return
+    except (KeyError, TypeError, ValueError):
+        # An entry from an incompatible version
         pass
+    git_dir.analyze_status(list_ignored=True)
+    git_dir.timings['status key'] = key_time
+    # Without a key, only kept for the ignored directories
+    cache[path] = dict(git_dir.cache_entry(key), ignored=git_dir.ignored_dirs)
+
+
+def scan_repos(
+    git_dirs: list[GitDir], jobs: int = Options.jobs, cache: dict[str, dict] | None = None
+) -> list[GitDir]:
+    """
+    Set the statuses of git_dirs with scan_repo(), scanning up to jobs repos
+    at once. Returns the ones scanned, without the repos that were removed
+    since they were found.
+    """
+
+    def scan(git_dir: GitDir) -> bool:
+        try:
+            scan_repo(git_dir, cache)
+        except ValueError:
+            # No longer a repo
+            return False
+        return True
+
+    # Scan up to jobs repos at once, their git subprocesses run in parallel
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return [git_dir for git_dir, scanned in zip(git_dirs, executor.map(scan, git_dirs)) if scanned]
+
+
+def list_dirs(
+    jobs: int = Options.jobs,
+    cache_path: Path | None = None,
+    depth: int = Options.depth,
+    timings: dict[str, float] | None = None,
+) -> tuple[list[GitDir], list[RegularDir]]:
+    """
+    Find the repos and regular directories and scan the repos. The seconds
+    spent finding them and scanning them are set in timings as 'find' and 'scan'.
+    """
+    start = time.perf_counter()
+    repos, regular = find_dirs(depth, jobs)
+    git_dirs = [GitDir(path) for path in repos]
+    regular_dirs = [RegularDir(path) for path in regular]
+    found = time.perf_counter()
+
+    cache = load_status_cache(cache_path) if cache_path else None
+    git_dirs = scan_repos(git_dirs, jobs, cache)
+    if timings is not None:
+        timings['find'] = found - start
+        timings['scan'] = time.perf_counter() - found
+
+    if cache_path:
+        # Forget repos that were deleted
+        save_status_cache(cache_path, {path: entry for path, entry in cache.items() if Path(path, '.git').exists()})
 
     return git_dirs, regular_dirs
 
 
+# How long to wait for the server, which may have to scan every repo on the first request
+SERVER_TIMEOUT = 120.0
+
+
+class ServerError(Exception):
+    """The server answered a request with an error."""
+
+
+def default_socket_path() -> str:
+    """Socket of --server when --socket isn't given, which myws-tui.py asks too."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return os.path.join(runtime_dir, 'myworkspace.sock')
+    return os.path.join(os.environ.get('TMPDIR', '/tmp'), f'myworkspace-{os.getuid()}.sock')
+
+
+class Workspace:
+    """
+    Scan state of one workspace directory, kept by the server between
+    requests: the statuses of its last refresh, which requests are answered
+    from, and with a cache, the statuses of its repos with their
+    status_key(), so that a refresh only runs git in the repos that changed
+    since the previous one. The server refreshes it in the background; a
+    request only waits for a refresh if there was none yet, or if the last
+    one started STALE_AFTER intervals ago. Refreshes run one at a time, and
+    the requests that come in during one share it.
+    """
+
+    STALE_AFTER = 3
+
+    def __init__(self, root: str, depth: int, jobs: int, interval: float, cache: dict[str, dict] | None):
+        self.root = root
+        self.depth = depth
+        self.jobs = jobs
+        self.interval = interval
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.result: dict | None = None
+        # time.monotonic() when the refresh of result started, and of the last request
+        self.refreshed = 0.0
+        self.requested = time.monotonic()
+
+    def status(self) -> dict:
+        """The statuses as of the last refresh, refreshing first if they are stale"""
+        self.requested = time.monotonic()
+        result = self.result
+        if result is not None and time.monotonic() - self.refreshed < self.STALE_AFTER * self.interval:
+            return result
+        return self.update(self.STALE_AFTER * self.interval)
+
+    def update(self, max_age: float) -> dict:
+        """Refresh unless a refresh started less than max_age seconds ago, including while waiting for another"""
+        with self.lock:
+            if self.result is None or time.monotonic() - self.refreshed >= max_age:
+                started = time.monotonic()
+                self.result = self.refresh()
+                self.refreshed = started
+            return self.result
+
+    def refresh(self) -> dict:
+        repos, regular = find_dirs(self.depth, self.jobs, self.root)
+        git_dirs = [GitDir(os.path.join(self.root, repo)) for repo in repos]
+        scanned = set(scan_repos(git_dirs, self.jobs, self.cache))
+        if self.cache is not None:
+            # Forget repos that were deleted
+            paths = {git_dir.name for git_dir in scanned}
+            for path in [path for path in self.cache if path not in paths]:
+                del self.cache[path]
+        return {
+            'repos': [
+                dict(git_dir.cache_entry(), name=repo) for repo, git_dir in zip(repos, git_dirs) if git_dir in scanned
+            ],
+            'regular': regular,
+        }
+
+
+def source_mtime() -> int:
+    return os.stat(__file__).st_mtime_ns
+
+
+def handle_request(line: str, server: 'StatusServer') -> tuple[str, bool]:
+    """
+    Answer one JSON-RPC 2.0 request line, returning (response_line, shutdown).
+
+    Methods:
+    - status, params {"root": absolute path, "depth": int}: {"repos": [...],
+      "regular": [...]}, each repo being {"name", "sync", "working",
+      "ahead_behind"}, with names relative to root, as in the status cache,
+      from the last refresh of the workspace (see Workspace)
+    - ping: {"pid": the server's process id}
+    - shutdown: stops the server after answering
+
+    If myworkspace.py changed on disk since the server started, every request
+    fails and the server shuts down, so clients fall back to scanning with
+    the new code instead of getting statuses from the old one.
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise TypeError
+    except (ValueError, TypeError):
+        return rpc_error(request_id, -32700, 'Parse error'), False
+    request_id = request.get('id')
+
+    if source_mtime() != server.started_mtime:
+        return rpc_error(request_id, -32000, 'myworkspace.py changed since the server started'), True
+
+    method = request.get('method')
+    params = request.get('params') or {}
+    if method == 'status':
+        root = params.get('root') if isinstance(params, dict) else None
+        depth = params.get('depth', Options.depth) if isinstance(params, dict) else None
+        if not isinstance(root, str) or not os.path.isabs(root) or not isinstance(depth, int) or depth < 1:
+            return rpc_error(request_id, -32602, 'params.root must be an absolute path and params.depth >= 1'), False
+        try:
+            return rpc_result(request_id, server.workspace(root, depth).status()), False
+        except Exception as e:
+            return rpc_error(request_id, -32603, f'Error scanning {root}: {e}'), False
+    if method == 'ping':
+        return rpc_result(request_id, {'pid': os.getpid()}), False
+    if method == 'shutdown':
+        return rpc_result(request_id, None), True
+    return rpc_error(request_id, -32601, f'Unknown method: {method}'), False
+
+
+def rpc_result(request_id, result) -> str:
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'result': result}, ensure_ascii=False)
+
+
+def rpc_error(request_id, code: int, message: str) -> str:
+    return json.dumps({'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}})
+
+
+class StatusRequestHandler(socketserver.StreamRequestHandler):
+    """Serves the requests of one client connection, which may send any number of them."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response, shutdown = handle_request(line.decode('utf-8', 'replace'), self.server)
+            self.wfile.write(response.encode('utf-8') + b'\n')
+            self.wfile.flush()
+            if shutdown:
+                # Runs in the connection's own thread, so it can wait for serve_forever() to return
+                self.server.shutdown()
+                return
+
+
+class StatusServer(socketserver.ThreadingUnixStreamServer):
+    """
+    Keeps a Workspace for each directory and depth clients asked about, and
+    refreshes them every interval seconds from a thread of its own, until
+    nobody asked about them for IDLE_AFTER seconds. The cache is saved at
+    most every SAVE_INTERVAL seconds, and when the server stops.
+    """
+
+    daemon_threads = True
+    IDLE_AFTER = 600.0
+    SAVE_INTERVAL = 60.0
+
+    def __init__(self, path: str, jobs: int, interval: float, cache_path: Path | None):
+        super().__init__(path, StatusRequestHandler)
+        self.jobs = jobs
+        self.interval = interval
+        self.started_mtime = source_mtime()
+        self.cache_path = cache_path
+        # Where the workspaces start from, and what is saved with theirs
+        self.cache = load_status_cache(cache_path) if cache_path else None
+        self.saved = time.monotonic()
+        self.workspaces: dict[tuple[str, int], Workspace] = {}
+        self.workspaces_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.refresher = threading.Thread(target=self.refresh_workspaces, daemon=True)
+        self.refresher.start()
+
+    def workspace(self, root: str, depth: int) -> Workspace:
+        with self.workspaces_lock:
+            key = (os.path.normpath(root), depth)
+            if key not in self.workspaces:
+                prefix = os.path.join(key[0], '')
+                cache = None
+                if self.cache is not None:
+                    cache = {path: entry for path, entry in self.cache.items() if path.startswith(prefix)}
+                self.workspaces[key] = Workspace(key[0], depth, self.jobs, self.interval, cache)
+            return self.workspaces[key]
+
+    def refresh_workspaces(self) -> None:
+        while not self.stopping.wait(self.interval):
+            with self.workspaces_lock:
+                now = time.monotonic()
+                for key in [key for key, ws in self.workspaces.items() if now - ws.requested > self.IDLE_AFTER]:
+                    del self.workspaces[key]
+                workspaces = list(self.workspaces.values())
+            for workspace in workspaces:
+                if self.stopping.is_set():
+                    return
+                try:
+                    # Not again if a request just did
+                    workspace.update(self.interval)
+                except Exception:
+                    # The next request refreshes again, and reports the error
+                    pass
+            if time.monotonic() - self.saved >= self.SAVE_INTERVAL:
+                self.save_cache()
+
+    def save_cache(self) -> None:
+        if self.cache is None:
+            return
+        with self.workspaces_lock:
+            workspaces = list(self.workspaces.values())
+        for workspace in workspaces:
+            with workspace.lock:
+                self.cache.update(workspace.cache)
+        # Forget repos that were deleted
+        self.cache = {path: entry for path, entry in self.cache.items() if Path(path, '.git').exists()}
+        save_status_cache(self.cache_path, self.cache)
+        self.saved = time.monotonic()
+
+
+def serve_socket(path: str, jobs: int, interval: float, cache_path: Path | None) -> None:
+    """Serve status requests on a Unix socket until a shutdown request."""
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except OSError:
+            # Left behind by a server that didn't exit cleanly
+            os.unlink(path)
+        else:
+            raise OSError(f'a server is already listening on {path}')
+        finally:
+            probe.close()
+
+    old_umask = os.umask(0o077)
+    try:
+        server = StatusServer(path, jobs, interval, cache_path)
+    finally:
+        os.umask(old_umask)
+    # Like an interrupt, so that the cache is saved and the socket removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    finally:
+        server.stopping.set()
+        server.save_cache()
+        server.server_close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def request_status(root: str, depth: int, path: str, timeout: float = SERVER_TIMEOUT) -> dict:
+    """Ask the server on path for the statuses of workspace root, raising OSError or ServerError on failure."""
+    request = json.dumps({
+        'jsonrpc': '2.0', 'id': 1, 'method': 'status', 'params': {'root': root, 'depth': depth},
+    })
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(request.encode('utf-8') + b'\n')
+        with sock.makefile('rb') as f:
+            line = f.readline()
+
+    try:
+        response = json.loads(line)
+    except ValueError:
+        raise ServerError('invalid response')
+    if not isinstance(response, dict) or not isinstance(response.get('result'), dict):
+        error = response.get('error') if isinstance(response, dict) else None
+        raise ServerError(error.get('message', 'unknown error') if isinstance(error, dict) else 'invalid response')
+    return response['result']
+
+
+def list_dirs_from_server(
+    root: str, depth: int, path: str, git_dir_class: type = GitDir
+) -> tuple[list[GitDir], list[RegularDir]]:
+    """Like list_dirs() for workspace root, from the server listening on path, the repos being git_dir_class."""
+    result = request_status(root, depth, path)
+    try:
+        git_dirs = []
+        for entry in result['repos']:
+            git_dir = git_dir_class(entry['name'])
+            git_dir.load_cache_entry(entry)
+            git_dirs.append(git_dir)
+        return git_dirs, [RegularDir(name) for name in result['regular']]
+    except (KeyError, TypeError, ValueError):
+        raise ServerError('invalid response')
+
+
 def echo(s: str, indent: int | None = None, prefix: str | None = None) -> None:
     if prefix:
         s = prefix + s
@@ -279,12 +1054,115 @@ def echo_dirs(dirs: list, indent: int | None = None, prefix: str = '│') -> Non
         echo(line_str, indent, prefix + ' ')
 
 
+def echo_timings(
+    git_dirs: list[GitDir], timings: dict[str, float], jobs: int, top: int, indent: int | None = None
+) -> None:
+    """Show how long the scan took against the jobs it had, then the top slowest repos with the time of each step."""
+    prefix = '│ '
+    scan = timings['scan']
+    repo_time = sum(git_dir.scan_time for git_dir in git_dirs)
+    cached = sum(1 for git_dir in git_dirs if git_dir.cached)
+    slowest = sorted(git_dirs, key=lambda git_dir: git_dir.scan_time, reverse=True)[:top]
+
+    echo('⏱️ Timings:')
+    echo(
+        f"Found {len(git_dirs)} repos in {timings['find']:.2f}s, scanned them in {scan:.2f}s with {jobs} jobs"
+        f' ({cached} from the cache)',
+        indent, prefix,
+    )
+    if not slowest:
+        echo('')
+        return
+    busy = f', {repo_time / scan:.1f} scanned at once on average' if scan else ''
+    echo(f'{repo_time:.2f}s of repo time{busy}', indent, prefix)
+    # The scan can't end before its slowest repo, however many jobs there are
+    if slowest[0].scan_time >= repo_time / jobs:
+        bound = f'Not under {slowest[0].scan_time:.2f}s with more jobs, {slowest[0].name} alone takes that'
+    else:
+        bound = f'Not under {repo_time / jobs:.2f}s with {jobs} jobs, repo time split evenly'
+    echo(bound, indent, prefix)
+
+    echo(f'Slowest {len(slowest)}:', indent, prefix)
+    width = max(len(git_dir.name) for git_dir in slowest)
+    for git_dir in slowest:
+        steps = ', '.join(f'{step} {seconds:.3f}s' for step, seconds in git_dir.timings.items())
+        echo(f'{git_dir.scan_time:8.3f}s  {git_dir.name.ljust(width)}  {steps}', indent, prefix)
+    echo('')
+
+
+def parse_args(options: Options) -> Options:
+    parser = argparse.ArgumentParser(
+        description='Show the git status of every repository in the current directory',
+        epilog='With a server running (--server), scans are shared with every other myworkspace.py and myws-tui.py.',
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=options.jobs,
+        help=f'Number of repositories to scan at once (default: {options.jobs})'
+    )
+    parser.add_argument(
+        '--cache', dest='use_cache', action='store_true',
+        help=f'Reuse the statuses of unchanged repositories from {options.cache_path}, which is only faster '
+        'where git status is slower than walking the worktree, like without an fsmonitor on huge repos'
+    )
+    parser.add_argument(
+        '-d', '--depth', type=int, default=options.depth,
+        help=f'Directory levels to look down for repositories, like 3 for org/team/repo (default: {options.depth})'
+    )
+    parser.add_argument(
+        '--server', action='store_true',
+        help='Keep the statuses of the workspaces clients ask about, and answer them on a Unix socket'
+    )
+    parser.add_argument('--socket', help=f'Socket of the server (default: {default_socket_path()})')
+    parser.add_argument(
+        '--refresh-interval', type=float, default=options.refresh_interval, metavar='SECONDS',
+        help='Seconds between the rescans of a server, whose answers are rescanned first when three times older '
+        f'(default: {options.refresh_interval:g})'
+    )
+    parser.add_argument(
+        '--no-server', dest='use_server', action='store_false', help='Scan in this process even if a server is running'
+    )
+    parser.add_argument(
+        '--timings', type=int, nargs='?', const=10, default=options.timings, metavar='N',
+        help='Scan in this process and show the time each repo took, by git command, for the N slowest (default: 10)'
+    )
+    args = parser.parse_args()
+    options.jobs = max(1, args.jobs)
+    options.use_cache = args.use_cache
+    options.depth = max(1, args.depth)
+    options.server = args.server
+    options.use_server = args.use_server
+    options.socket_path = args.socket or default_socket_path()
+    options.refresh_interval = max(1.0, args.refresh_interval)
+    options.timings = max(0, args.timings)
+    return options
+
+
 def main() -> None:
-    options = Options()
+    options = parse_args(Options())
+    cache_path = options.cache_path if options.use_cache else None
+    if options.server:
+        try:
+            serve_socket(options.socket_path, options.jobs, options.refresh_interval, cache_path)
+        except OSError as e:
+            echo(f'Error: {e}')
+            raise SystemExit(1)
+        except KeyboardInterrupt:
+            pass
+        return
+
     echo(f'cwd: {os.getcwd()}')
     echo('Scanning..\n')
 
-    git_dirs, regular_dirs = list_dirs()
+    served = None
+    # The server's answers don't say what its scans took
+    if options.use_server and not options.timings:
+        try:
+            served = list_dirs_from_server(os.getcwd(), options.depth, options.socket_path)
+        except (OSError, ServerError):
+            # No server running
+            pass
+    timings: dict[str, float] = {}
+    git_dirs, regular_dirs = served or list_dirs(options.jobs, cache_path, options.depth, timings)
 
     # Group git dirs by sync and working dir status
     groups: dict[tuple, list] = {}
@@ -319,6 +1197,9 @@ def main() -> None:
         echo_dirs(regular_dirs, tab)
         echo('')
 
+    if options.timings:
+        echo_timings(git_dirs, timings, options.jobs, options.timings, tab)
+
 
 if __name__ == '__main__':
     main()
@@ -6,34 +6,42 @@
 # ///
 
 import os
+import sys
+import argparse
+import struct
+import signal
+import ctypes
+import ctypes.util
 import subprocess
 import asyncio
+import time
 from concurrent.futures import ThreadPoolExecutor
 from collections import OrderedDict
-from contextlib import contextmanager
 from pathlib import Path
-from enum import Enum
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Callable, Set
 
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical, ScrollableContainer
-from textual.widgets import Header, Footer, Static, Button, Label, LoadingIndicator, Input, RichLog, DataTable
+from textual.widgets import Header, Footer, Button, Label, LoadingIndicator, Input, RichLog, DataTable
 from textual.message import Message
 from textual.reactive import reactive
 from textual.events import Click
 from textual import on, work
 from textual.css.query import NoMatches
-
-
-class SyncStatus(Enum):
-    SYNC = "sync"
-    OUT_OF_SYNC = "out-of-sync"
-
-
-class WorkingDirStatus(Enum):
-    CLEAN = "clean"
-    UNTRACKED = "untracked"
-    DIRTY = "dirty"
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual.geometry import Region, Size
+from rich.cells import cell_len
+from rich.segment import Segment
+from rich.text import Text
+
+# Shares the workspace scanning of myworkspace.py, next to this script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import myworkspace
+from myworkspace import (
+    SyncStatus, WorkingDirStatus, RegularDir, ServerError, find_dirs, scan_repo,
+    load_status_cache, save_status_cache, default_socket_path, list_dirs_from_server,
+)
 
 
 # Ordered status combinations with their priority emojis
@@ -47,237 +55,567 @@ STATUS_PRIORITY_ORDER = OrderedDict([
 ])
 
 
-@contextmanager
-def cdctx(path: str):
-    old_cwd = os.getcwd()
-    os.chdir(path)
-    try:
-        yield
-    finally:
-        os.chdir(old_cwd)
+# Repos scanned at once; each scan mostly waits on git subprocesses
+DEFAULT_JOBS = min(32, (os.cpu_count() or 1) * 4)
+# Repos fetched or pulled at once by the group actions, and how long each may take
+DEFAULT_FETCH_JOBS = 8
+DEFAULT_FETCH_TIMEOUT = 120
+# Directory levels looked down for repos, 1 being the directories of the current directory
+DEFAULT_DEPTH = 1
+
 
+# Statuses of the last scan, reused with --cache for repos where nothing changed since
+STATUS_CACHE_PATH = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache', 'myworkspace', 'tui-status.json')
 
-def analyze_git_directory(dir_name: str) -> Optional['GitDir']:
-    """Worker function to analyze a git directory - safe for threading"""
+
+def analyze_git_directory(dir_name: str, cache: Optional[Dict[str, dict]] = None) -> Optional['GitDir']:
+    """Worker function to analyze a git directory - safe for threading, git runs with -C instead of a chdir"""
     try:
         if not Path(dir_name, '.git').exists():
             return None
-        
-        # Use absolute path to avoid working directory conflicts in threads
-        abs_path = os.path.abspath(dir_name)
+
         git_dir = GitDir(dir_name)
-        
-        # Perform all git operations with absolute paths in the worker thread
-        with cdctx(abs_path):
-            git_dir.analyze_status(use_cwd=True)
-        
+        scan_repo(git_dir, cache)
         return git_dir
     except Exception as e:
         # Log error but don't print to avoid TUI interference  
         return None
 
 
-class GitDir:
-    def __init__(self, name: str):
-        self.name = name
-        self.sync_status: Optional[SyncStatus] = None
-        self.working_dir_status: Optional[WorkingDirStatus] = None
-        self.detailed_status: str = ""
-        self.ahead_behind: Tuple[int, int] = (0, 0)
-
-    def analyze_status(self, use_cwd: bool = False) -> None:
-        if use_cwd:
-            # Already in correct directory, don't change directory
-            if not Path('.git').exists():
-                raise ValueError(f'{self.name} is not a git repository')
-            self._check_sync_status()
-            self._check_working_dir_status()
-            self._get_detailed_status()
-        else:
-            # Change to directory (original behavior)
-            with cdctx(self.name):
-                if not Path('.git').exists():
-                    raise ValueError(f'{self.name} is not a git repository')
-                self._check_sync_status()
-                self._check_working_dir_status()
-                self._get_detailed_status()
-
-    def _check_sync_status(self) -> None:
-        try:
-            result = subprocess.run(
-                ['git', 'rev-parse', '--abbrev-ref', '--symbolic-full-name', '@{u}'],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+# ANSI colors of `git -c color.ui=always status --short --branch`
+GREEN = '\033[32m'
+RED = '\033[31m'
+RESET = '\033[m'
 
-            if result.returncode != 0:
-                self.sync_status = SyncStatus.SYNC
-                return
 
-            result = subprocess.run(
-                ['git', 'rev-list', '--left-right', '--count', 'HEAD...@{u}'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+def quote_spaces(path: str) -> str:
+    """Quote a path with spaces like the short format does (porcelain output only quotes special characters)."""
+    if ' ' in path and not path.startswith('"'):
+        return f'"{path}"'
+    return path
 
-            ahead, behind = map(int, result.stdout.strip().split())
-            self.ahead_behind = (ahead, behind)
-            
-            if ahead == 0 and behind == 0:
-                self.sync_status = SyncStatus.SYNC
-            else:
-                self.sync_status = SyncStatus.OUT_OF_SYNC
 
-        except subprocess.CalledProcessError:
-            self.sync_status = SyncStatus.OUT_OF_SYNC
+def format_short_status(branch: Dict[str, str], ahead_behind: Optional[Tuple[int, int]], entries: list) -> str:
+    """
+    Render parsed `git status --porcelain=v2 --branch` output the way
+    `git -c color.ui=always status --short --branch` shows it, so the
+    detailed status doesn't need a git process of its own.
+    """
+    head = branch.get('head', '')
+    if head == '(detached)':
+        lines = [f'## {RED}HEAD (no branch){RESET}']
+    elif branch.get('oid') == '(initial)':
+        lines = [f'## No commits yet on {GREEN}{head}{RESET}']
+    else:
+        line = f'## {GREEN}{head}{RESET}'
+        if 'upstream' in branch:
+            line += f"...{RED}{branch['upstream']}{RESET}"
+            if ahead_behind is None:
+                line += ' [gone]'
+            elif ahead_behind != (0, 0):
+                ahead, behind = ahead_behind
+                counts = []
+                if ahead:
+                    counts.append(f'ahead {GREEN}{ahead}{RESET}')
+                if behind:
+                    counts.append(f'behind {RED}{behind}{RESET}')
+                line += f" [{', '.join(counts)}]"
+        lines = [line]
+
+    # entries are (kind, XY, path) with the kind of line they come from: 1, 2, u or ?
+    for kind, xy, path in entries:
+        if kind in ('?', 'u'):
+            lines.append(f'{RED}{xy}{RESET} {path}')
+        else:
+            # Staged change in green, unstaged change in red, '.' for none
+            index = f'{GREEN}{xy[0]}{RESET}' if xy[0] != '.' else ' '
+            worktree = f'{RED}{xy[1]}{RESET}' if xy[1] != '.' else ' '
+            lines.append(f'{index}{worktree} {path}')
 
-    def _check_working_dir_status(self) -> None:
-        try:
-            result = subprocess.run(
-                ['git', 'status', '--porcelain'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
+    return '\n'.join(lines)
 
-            status_lines = result.stdout.strip().split('\n') if result.stdout.strip() else []
 
-            if (Path('.git/MERGE_HEAD').exists() or
-                Path('.git/rebase-merge').exists() or
-                Path('.git/rebase-apply').exists()):
-                self.working_dir_status = WorkingDirStatus.DIRTY
-                return
+# Bytes read from a command's output at a time, and the longest line passed on whole
+STREAM_CHUNK = 1 << 16
 
-            if not status_lines:
-                self.working_dir_status = WorkingDirStatus.CLEAN
-                return
 
-            has_uncommitted = False
-            has_untracked = False
+async def run_streaming(
+    command, write: Callable[[str, bool], None], cwd: Optional[str] = None, shell: bool = False,
+    env: Optional[Dict[str, str]] = None
+) -> int:
+    """
+    Run a command without blocking the event loop, calling write(line, is_stderr)
+    for each line of its output as it arrives, and return its exit code.
+    Lines longer than STREAM_CHUNK bytes are passed on in pieces of that size.
+    Cancelling the calling task terminates the command and everything it started.
+    """
+    kwargs = dict(
+        cwd=cwd, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        # Own process group, so a cancel reaches the shell's children too
+        start_new_session=True,
+    )
+    if shell:
+        process = await asyncio.create_subprocess_shell(command, **kwargs)
+    else:
+        process = await asyncio.create_subprocess_exec(*command, **kwargs)
+
+    def emit(line: bytes, is_stderr: bool) -> None:
+        write(line.decode('utf-8', errors='replace').rstrip('\r'), is_stderr)
+
+    async def pump(stream, is_stderr: bool) -> None:
+        # Split by hand, StreamReader's own line reading fails on lines over its limit
+        pending = b''
+        while True:
+            chunk = await stream.read(STREAM_CHUNK)
+            if not chunk:
+                break
+            *lines, pending = (pending + chunk).split(b'\n')
+            for line in lines:
+                emit(line, is_stderr)
+            while len(pending) >= STREAM_CHUNK:
+                emit(pending[:STREAM_CHUNK], is_stderr)
+                pending = pending[STREAM_CHUNK:]
+        if pending:
+            emit(pending, is_stderr)
 
-            for line in status_lines:
-                if line.startswith('??'):
-                    has_untracked = True
-                else:
-                    has_uncommitted = True
+    try:
+        await asyncio.gather(pump(process.stdout, False), pump(process.stderr, True))
+        return await process.wait()
+    except BaseException:
+        # Cancelled, or write() failed: don't leave the command running
+        for sig in (signal.SIGTERM, signal.SIGKILL):
+            try:
+                os.killpg(process.pid, sig)
+            except ProcessLookupError:
+                break
+            try:
+                await asyncio.wait_for(process.wait(), 2)
+                break
+            except asyncio.TimeoutError:
+                pass
+        raise
+
+
+def index_stat(repo: str) -> Optional[Tuple[int, int]]:
+    """The inode and mtime of repo's index, both new whenever git writes it"""
+    try:
+        st = os.stat(os.path.join(repo, '.git', 'index'))
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
 
-            if has_uncommitted:
-                self.working_dir_status = WorkingDirStatus.DIRTY
-            elif has_untracked:
-                self.working_dir_status = WorkingDirStatus.UNTRACKED
-            else:
-                self.working_dir_status = WorkingDirStatus.CLEAN
 
-        except subprocess.CalledProcessError:
-            self.working_dir_status = WorkingDirStatus.DIRTY
+class RepoWatcher:
+    """
+    Watch repos with inotify (Linux only, through ctypes) and call
+    on_change(names, rescan) with the repos that saw changes, coalescing the
+    events of DEBOUNCE seconds into one call. rescan is True when directories
+    were added to or removed from the workspace, or events were lost. A new
+    index only counts as a change if own_index(name) is False, that is if it
+    isn't the one the TUI's own git status left after refreshing it.
+
+    Watched: each repo's worktree top level, .git itself (HEAD, index,
+    packed-refs, config and merge state are all written by renaming into it)
+    and every directory under .git/refs.
+    """
 
-    def _get_detailed_status(self) -> None:
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_ISDIR = 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    EVENT_HEADER = struct.Struct('iIII')
+    # Events coming within this many seconds of the first one are handled together
+    DEBOUNCE = 0.3
+
+    def __init__(self, on_change: Callable[[Set[str], bool], None], own_index: Callable[[str], bool]):
+        self.on_change = on_change
+        self.own_index = own_index
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        # Watch descriptor -> (repo name or None for the workspace, what it watches, path)
+        self.watches: Dict[int, Tuple[Optional[str], str, str]] = {}
+        self.changed: Set[str] = set()
+        # Repos where the only change seen so far is a new index
+        self.index_changed: Set[str] = set()
+        self.rescan = False
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.fd, self._read_events)
+
+    @classmethod
+    def create(
+        cls, on_change: Callable[[Set[str], bool], None], own_index: Callable[[str], bool]
+    ) -> Optional['RepoWatcher']:
+        """A watcher, or None where inotify isn't available"""
         try:
-            result = subprocess.run(
-                ['git', '-c', 'color.ui=always', 'status', '--short', '--branch'],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            self.detailed_status = result.stdout.strip()
-        except subprocess.CalledProcessError:
-            self.detailed_status = "Error getting git status"
+            return cls(on_change, own_index)
+        except (OSError, AttributeError):
+            return None
 
-    async def git_operation(self, operation: str) -> str:
+    def _add_watch(self, path: str, repo: Optional[str], kind: str) -> None:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd >= 0:
+            self.watches[wd] = (repo, kind, path)
+
+    def watch_workspace(self, path: str, repos: List[str]) -> None:
+        """Replace all watches with ones for the workspace directory and the given repos under it"""
+        for wd in list(self.watches):
+            self.libc.inotify_rm_watch(self.fd, wd)
+        self.watches.clear()
+        # The directories repos are in, to see repos being added or removed
+        workspace_dirs = {path}
+        for repo in repos:
+            parent = os.path.dirname(repo)
+            while parent:
+                workspace_dirs.add(os.path.join(path, parent))
+                parent = os.path.dirname(parent)
+        for workspace_dir in workspace_dirs:
+            self._add_watch(workspace_dir, None, 'workspace')
+        for repo in repos:
+            git_path = os.path.join(path, repo, '.git')
+            if not os.path.isdir(git_path):
+                # Linked worktrees and submodules keep their git directory elsewhere
+                continue
+            self._add_watch(os.path.join(path, repo), repo, 'worktree')
+            self._add_watch(git_path, repo, 'git')
+            for dirpath, _, _ in os.walk(os.path.join(git_path, 'refs')):
+                self._add_watch(dirpath, repo, 'refs')
+
+    def _read_events(self) -> None:
         try:
-            with cdctx(self.name):
-                result = subprocess.run(
-                    ['git', operation],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                await asyncio.sleep(0.1)
-                return result.stdout + result.stderr
-        except subprocess.CalledProcessError as e:
-            return f"Error: {e.stderr}"
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, pos)
+            name = data[pos + self.EVENT_HEADER.size:pos + self.EVENT_HEADER.size + length].rstrip(b'\0')
+            pos += self.EVENT_HEADER.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                self.rescan = True
+                continue
+            repo, kind, path = self.watches.get(wd, (None, None, None))
+            if kind is None or name.endswith(b'.lock'):
+                # Lock files come and go around every write
+                continue
+            if kind == 'workspace':
+                if mask & self.IN_ISDIR:
+                    self.rescan = True
+                continue
+            if kind == 'refs' and mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                # New ref namespace, like the one of a branch called feature/x
+                self._add_watch(os.path.join(path, os.fsdecode(name)), repo, kind)
+            if kind == 'git' and name == b'index':
+                # Renamed into place by git status' own index refresh too, checked when flushing
+                self.index_changed.add(repo)
+            else:
+                self.changed.add(repo)
+
+        if (self.changed or self.index_changed or self.rescan) and not self.timer:
+            self.timer = self.loop.call_later(self.DEBOUNCE, self._flush)
+
+    def _flush(self) -> None:
+        changed, rescan = self.changed, self.rescan
+        # By then the scan that refreshed the index has most likely recorded it
+        changed |= {repo for repo in self.index_changed - changed if not self.own_index(repo)}
+        self.changed, self.index_changed, self.rescan, self.timer = set(), set(), False, None
+        if changed or rescan:
+            self.on_change(changed, rescan)
+
+    def close(self) -> None:
+        if self.timer:
+            self.timer.cancel()
+        self.loop.remove_reader(self.fd)
+        os.close(self.fd)
 
 
-class RegularDir:
+class GitDir(myworkspace.GitDir):
+    """A repo with its short status for the detail view, and the git operations run from there"""
+
     def __init__(self, name: str):
-        self.name = name
+        super().__init__(name)
+        self.detailed_status: str = ""
+        # Index as the last git status left it, see index_stat()
+        self.index_stat: Optional[Tuple[int, int]] = None
+
+    def analyze_status(self, list_ignored: bool = False) -> None:
+        # Replaced by the short status when git succeeds
+        self.detailed_status = "Error getting git status"
+        super().analyze_status(list_ignored)
+        # git status may have refreshed the index, the watcher doesn't take that for a change
+        self.index_stat = index_stat(self.name)
+
+    def _parse_status(self, output: str, refs: Optional[Tuple[Dict[str, str], Optional[str]]] = None) -> None:
+        """Also render the detailed status, from the branch lines of the output or else from refs"""
+        super()._parse_status(output, refs)
+        branch: Dict[str, str] = {}
+        ahead_behind = None
+        if refs is not None:
+            branch = dict(refs[0])
+            # Gone upstreams have no counts, like in git's output
+            ahead_behind = (0, 0) if refs[1] else None
+        entries = []
+
+        for line in output.splitlines():
+            if line.startswith('# branch.'):
+                key, _, value = line[len('# branch.'):].partition(' ')
+                branch[key] = value
+                if key == 'ab':
+                    ahead_behind = self.ahead_behind
+            elif line.startswith('? '):
+                entries.append(('?', '??', quote_spaces(line[2:])))
+            elif line.startswith('1 '):
+                fields = line.split(' ', 8)
+                entries.append(('1', fields[1], quote_spaces(fields[8])))
+            elif line.startswith('2 '):
+                fields = line.split(' ', 9)
+                path, orig_path = fields[9].split('\t', 1)
+                entries.append(('2', fields[1], f'{quote_spaces(orig_path)} -> {quote_spaces(path)}'))
+            elif line.startswith('u '):
+                fields = line.split(' ', 10)
+                entries.append(('u', fields[1], quote_spaces(fields[10])))
+
+        self.detailed_status = format_short_status(branch, ahead_behind, entries)
+
+    def cache_entry(self, key: Optional[str] = None) -> dict:
+        return dict(super().cache_entry(key), detailed=self.detailed_status)
+
+    def load_cache_entry(self, entry: dict) -> None:
+        super().load_cache_entry(entry)
+        # Not sent by the workspace server, the detail view scans the repo again when it's missing
+        self.detailed_status = entry.get('detailed', '')
+
+    async def git_operation(self, operation: str, write: Callable[[str, bool], None]) -> int:
+        """Run git <operation>, passing each output line to write as it arrives, and return git's exit code"""
+        # There is no terminal to ask for credentials on, fail instead of waiting
+        env = dict(os.environ, GIT_TERMINAL_PROMPT='0')
+        return await run_streaming(['git', '-C', self.name, operation], write, env=env)
+
+
+def group_title_text(group_key: Optional[Tuple[SyncStatus, WorkingDirStatus]], emoji: str, count: int) -> str:
+    if group_key:
+        sync_status, working_status = group_key
+        return f"{emoji} {sync_status.value.title()} + {working_status.value.title()} ({count})"
+    return f"{emoji} Non-Git Directories ({count})"
+
+
+def timings_summary(git_dirs: List[GitDir], timings: Dict[str, float], jobs: int) -> str:
+    """How long the last scan took against the jobs it had, from the 'find' and 'scan' seconds in timings"""
+    if not timings:
+        return "The workspace server answered, start with --no-server to time the scan here"
+    if 'scan' not in timings:
+        return f"Still scanning, {len(git_dirs)} repos so far"
+    scan = timings['scan']
+    repo_time = sum(git_dir.scan_time for git_dir in git_dirs)
+    cached = sum(1 for git_dir in git_dirs if git_dir.cached)
+    lines = [
+        f"Found {len(git_dirs)} repos in {timings['find']:.2f}s, scanned them in {scan:.2f}s "
+        f"with {jobs} jobs ({cached} from the cache)"
+    ]
+    if git_dirs:
+        slowest = max(git_dirs, key=lambda git_dir: git_dir.scan_time)
+        busy = f", {repo_time / scan:.1f} scanned at once on average" if scan else ""
+        lines.append(f"{repo_time:.2f}s of repo time{busy}")
+        # The scan can't end before its slowest repo, however many jobs there are
+        if slowest.scan_time >= repo_time / jobs:
+            lines.append(f"Not under {slowest.scan_time:.2f}s with more jobs, {slowest.name} alone takes that")
+        else:
+            lines.append(f"Not under {repo_time / jobs:.2f}s with {jobs} jobs, repo time split evenly")
+    return "\n".join(lines)
 
 
-class DirectoryWidget(Static):
-    """Focusable directory widget"""
-    
-    DEFAULT_CSS = """
-    DirectoryWidget {
-        background: #404040;
-        margin: 0 1;
-        padding: 0 1;
-        min-width: 8;
-        max-width: 20;
-        width: auto;
-        height: 1;
-        text-align: center;
-        display: block;
+class DirectoryGrid(ScrollView, can_focus=True):
+    """
+    The groups of the main view, each a title followed by its directories
+    DIRS_PER_ROW per row, with a cursor on one directory. Drawn line by line,
+    so only the lines on screen are rendered whatever the number of
+    directories, and showing new groups mounts nothing.
+    """
+
+    COMPONENT_CLASSES = {
+        "directory-grid--title",
+        "directory-grid--title-selected",
+        "directory-grid--dir",
+        "directory-grid--cursor",
     }
-    DirectoryWidget:focus {
-        background: $accent;
-        text-style: bold underline;
+
+    DEFAULT_CSS = """
+    DirectoryGrid {
+        height: 1fr;
     }
-    DirectoryWidget.git-dir {
-        background: #404040;
+    DirectoryGrid > .directory-grid--title {
+        background: $surface;
+        color: $text;
+        text-style: bold;
     }
-    DirectoryWidget.git-dir:focus {
-        background: $accent;
-        text-style: bold underline;
+    DirectoryGrid > .directory-grid--title-selected {
+        background: $primary;
+        color: $text;
+        text-style: bold;
     }
-    DirectoryWidget.regular-dir {
+    DirectoryGrid > .directory-grid--dir {
         background: #404040;
     }
-    DirectoryWidget.regular-dir:focus {
+    DirectoryGrid > .directory-grid--cursor {
         background: $accent;
         text-style: bold underline;
     }
     """
-    
-    def __init__(self, dir_obj, *args, **kwargs):
-        self.dir_obj = dir_obj
-        super().__init__(dir_obj.name, *args, **kwargs)
-        self.can_focus = True
-        
-        if isinstance(dir_obj, GitDir):
-            self.add_class("git-dir")
+
+    DIRS_PER_ROW = 6
+    # Directory names are centered in cells of MIN_CELL_WIDTH to MAX_CELL_WIDTH columns
+    MIN_CELL_WIDTH = 8
+    MAX_CELL_WIDTH = 20
+    INDENT = 3
+    GAP = 2
+
+    class Selected(Message):
+        """A directory was clicked"""
+
+        def __init__(self, dir_obj) -> None:
+            super().__init__()
+            self.dir_obj = dir_obj
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.groups: List = []
+        # (group index, index of the first directory of the row) of each line,
+        # with None as the directory index for the group title and (None, None) for blank lines
+        self.lines: List[Tuple[Optional[int], Optional[int]]] = []
+        self.title_lines: List[int] = []
+        self.group_index = 0
+        self.dir_index = 0
+        self.cursor_dir = None
+
+    def cell_width(self, name: str) -> int:
+        return min(max(cell_len(name) + 2, self.MIN_CELL_WIDTH), self.MAX_CELL_WIDTH)
+
+    def set_groups(self, groups: List, group_index: int, focus_dir=None) -> None:
+        """
+        Show groups, with the cursor on focus_dir, or else on the directory it
+        was on, or else on the first directory of groups[group_index]
+        """
+        # A copy, as the app adds directories to its groups in place
+        self.groups = [(group_key, emoji, list(dirs)) for group_key, emoji, dirs in groups]
+        self.lines = [(None, None)]
+        self.title_lines = []
+        width = 0
+        for index, (_, _, dirs) in enumerate(self.groups):
+            self.title_lines.append(len(self.lines))
+            self.lines += [(index, None), (None, None)]
+            for start in range(0, len(dirs), self.DIRS_PER_ROW):
+                self.lines += [(index, start), (None, None)]
+                row = dirs[start:start + self.DIRS_PER_ROW]
+                width = max(width, self.INDENT + sum(self.cell_width(d.name) + self.GAP for d in row))
+        self.virtual_size = Size(width, len(self.lines))
+
+        previous_dir = self.cursor_dir
+        if focus_dir is not None and self.move_to(focus_dir):
+            return
+        if previous_dir is not None and self.move_to(previous_dir, scroll=False):
+            return
+        self.select_group(group_index)
+
+    def move_to(self, dir_obj, scroll: bool = True) -> bool:
+        """Put the cursor on dir_obj, returning False if it isn't shown"""
+        for group_index, (_, _, dirs) in enumerate(self.groups):
+            for dir_index, group_dir in enumerate(dirs):
+                if group_dir is dir_obj:
+                    self._move(group_index, dir_index, scroll)
+                    return True
+        return False
+
+    def select_group(self, group_index: int) -> None:
+        """Put the cursor on the first directory of a group"""
+        self._move(min(max(group_index, 0), max(0, len(self.groups) - 1)), 0)
+
+    def move_cursor(self, delta: int) -> None:
+        """Move the cursor by delta directories within its group, wrapping around"""
+        if self.group_index < len(self.groups) and self.groups[self.group_index][2]:
+            self._move(self.group_index, (self.dir_index + delta) % len(self.groups[self.group_index][2]))
+
+    def _move(self, group_index: int, dir_index: int, scroll: bool = True) -> None:
+        self.group_index, self.dir_index = group_index, dir_index
+        dirs = self.groups[group_index][2] if group_index < len(self.groups) else []
+        self.cursor_dir = dirs[dir_index] if dir_index < len(dirs) else None
+        self.refresh()
+        if scroll:
+            self.call_after_refresh(self._scroll_to_cursor)
+
+    def _scroll_to_cursor(self) -> None:
+        if self.group_index >= len(self.title_lines):
+            return
+        title_line = self.title_lines[self.group_index]
+        row_start = self.dir_index - self.dir_index % self.DIRS_PER_ROW
+        row_line = title_line + 2 + 2 * (row_start // self.DIRS_PER_ROW)
+        x = self.INDENT + sum(
+            self.cell_width(d.name) + self.GAP for d in self.groups[self.group_index][2][row_start:self.dir_index]
+        )
+        width = self.cell_width(self.cursor_dir.name) if self.cursor_dir else 1
+        # With the group title when it fits on screen
+        top = title_line if row_line - title_line < self.size.height else row_line
+        self.scroll_to_region(Region(x, top, width, row_line - top + 1), animate=False)
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        width = max(self.size.width, self.virtual_size.width)
+        line = scroll_y + y
+        group_index, start = self.lines[line] if line < len(self.lines) else (None, None)
+        if group_index is None:
+            return Strip.blank(self.size.width, self.rich_style)
+
+        group_key, emoji, dirs = self.groups[group_index]
+        if start is None:
+            selected = "-selected" if group_index == self.group_index else ""
+            style = self.get_component_rich_style(f"directory-grid--title{selected}")
+            strip = Strip([Segment(group_title_text(group_key, emoji, len(dirs)), style)])
+            strip = strip.extend_cell_length(width, style)
         else:
-            self.add_class("regular-dir")
+            dir_style = self.get_component_rich_style("directory-grid--dir")
+            cursor_style = self.get_component_rich_style("directory-grid--cursor")
+            segments = [Segment(" " * self.INDENT, self.rich_style)]
+            for index, dir_obj in enumerate(dirs[start:start + self.DIRS_PER_ROW], start):
+                cell_width = self.cell_width(dir_obj.name)
+                name = dir_obj.name
+                if cell_len(name) > cell_width - 2:
+                    # Keeping the end, the repo name of an org/team/repo path
+                    while cell_len(name) > cell_width - 3:
+                        name = name[1:]
+                    name = "…" + name
+                left = (cell_width - cell_len(name)) // 2
+                cell = " " * left + name + " " * (cell_width - cell_len(name) - left)
+                style = cursor_style if group_index == self.group_index and index == self.dir_index else dir_style
+                segments += [Segment(cell, style), Segment(" " * self.GAP, self.rich_style)]
+            strip = Strip(segments).extend_cell_length(width, self.rich_style)
+        return strip.crop(scroll_x, scroll_x + self.size.width)
+
+    def on_click(self, event: Click) -> None:
+        scroll_x, scroll_y = self.scroll_offset
+        line = scroll_y + event.y
+        group_index, start = self.lines[line] if 0 <= line < len(self.lines) else (None, None)
+        if group_index is None or start is None:
+            return
+        x = self.INDENT
+        dirs = self.groups[group_index][2]
+        for index, dir_obj in enumerate(dirs[start:start + self.DIRS_PER_ROW], start):
+            cell_width = self.cell_width(dir_obj.name)
+            if x <= scroll_x + event.x < x + cell_width:
+                self._move(group_index, index)
+                self.post_message(self.Selected(dir_obj))
+                return
+            x += cell_width + self.GAP
 
 
 class MyWorkspaceApp(App):
     """MyWorkspace TUI Application with Textual"""
     
     CSS = """
-    .group-title {
-        text-style: bold;
-        color: $text;
-        margin: 1 0;
-        background: $surface;
-        height: auto;
-        min-height: 1;
-    }
-    
-    .group-title.selected {
-        background: $primary;
-        color: $text;
-    }
-    
-    .directories-row {
-        layout: horizontal;
-        margin: 0 1 1 1;
-        padding: 0;
-        width: 100%;
-        height: auto;
-        min-height: 1;
-    }
-    
     .detail-view {
         padding: 1;
     }
@@ -304,12 +642,6 @@ class MyWorkspaceApp(App):
         padding: 0 1;
     }
     
-    #main-scroll {
-        padding: 1;
-        height: 1fr;
-        width: 100%;
-    }
-    
     #main-container {
         height: 1fr;
     }
@@ -335,10 +667,6 @@ class MyWorkspaceApp(App):
         height: auto;
     }
     
-    .dirs-container {
-        height: auto;
-    }
-    
     .shell-panel {
         border: solid $accent;
         margin: 1 0;
@@ -387,6 +715,14 @@ class MyWorkspaceApp(App):
         align: right middle;
     }
     
+    .bulk-table {
+        height: 1fr;
+    }
+    
+    .operation-log {
+        height: 12;
+    }
+    
     .detailed-status-log {
         height: auto;
         min-height: 3;
@@ -403,11 +739,27 @@ class MyWorkspaceApp(App):
         ("enter", "select", "Select"),
         ("backspace", "back", "Back"),
         ("r", "refresh", "Refresh"),
+        ("escape", "cancel", "Cancel"),
+        ("f", "fetch_group", "Fetch Group"),
+        ("p", "pull_group", "Pull Group"),
+        ("t", "show_timings", "Timings"),
         ("q", "quit", "Quit"),
     ]
 
-    def __init__(self):
+    def __init__(
+        self, jobs: int = DEFAULT_JOBS, fetch_jobs: int = DEFAULT_FETCH_JOBS,
+        fetch_timeout: float = DEFAULT_FETCH_TIMEOUT, depth: int = DEFAULT_DEPTH,
+        socket_path: Optional[str] = None, cache_path: Optional[Path] = None
+    ):
         super().__init__()
+        self.jobs = max(1, jobs)
+        self.depth = max(1, depth)
+        # The workspace server asked for the statuses before scanning here, if any
+        self.socket_path = socket_path
+        # Status cache of the scans run here, if any
+        self.cache_path = cache_path
+        self.fetch_jobs = max(1, fetch_jobs)
+        self.fetch_timeout = fetch_timeout
         self.current_dir = os.getcwd()
         self.git_dirs: List[GitDir] = []
         self.regular_dirs: List[RegularDir] = []
@@ -416,10 +768,23 @@ class MyWorkspaceApp(App):
         self.selected_dir: Optional[GitDir] = None
         self.operation_result = ""
         self.current_group_index = 0
-        self.group_widgets: List[List[DirectoryWidget]] = []
+        # The main view, kept mounted while the other views are shown
+        self.grid: Optional[DirectoryGrid] = None
+        self.is_scanning = False
+        # Keep the highest priority group selected while repos come in, until the user moves
+        self.follow_scan = False
         self.is_loading = False
         self.shell_output: List[str] = []
         self.shell_panel_visible = False
+        # A git operation or shell command is running, one at a time per app
+        self.command_running = False
+        # Keeps the main view current as repos change, None where inotify isn't available
+        self.watcher: Optional[RepoWatcher] = None
+        self.changed_during_scan: Set[str] = set()
+        # The watcher asked for a rescan while another view was shown, done when the main view is back
+        self.rescan_pending = False
+        # Seconds the last scan took to find the repos and to scan them, empty when the server answered
+        self.scan_timings: Dict[str, float] = {}
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -429,51 +794,216 @@ class MyWorkspaceApp(App):
     async def on_mount(self) -> None:
         """Initialize the application"""
         self.title = f"MyWorkspace TUI - {self.current_dir}"
-        await self.show_loading("Scanning directories...")
+        # Mounted before anything can wait on the server or the scan, so the keys always have a grid to move in
+        self.grid = DirectoryGrid(id="main-grid")
+        await self.query_one("#main-container").mount(self.grid)
+        self.watcher = RepoWatcher.create(self.on_repos_changed, self.is_own_index)
         self.load_directories()
 
-    @work
+    async def on_unmount(self) -> None:
+        if self.watcher:
+            self.watcher.close()
+
+    @work(exclusive=True)
     async def load_directories(self):
-        """Load directories in background"""
-        await asyncio.sleep(0.1)  # Give UI time to update
-        self.scan_directories()
-        await self.show_main_view()
+        """
+        Get the statuses from the workspace server, or else scan in the
+        background, adding each repo to the main view as soon as its status
+        is known
+        """
+        self.is_scanning = True
+        self.follow_scan = True
+        loop = asyncio.get_running_loop()
+        if self.socket_path:
+            self.sub_title = "Asking the workspace server"
+        # Off the event loop, a deep workspace takes a while to walk
+        served = await loop.run_in_executor(None, self.dirs_from_server)
+        self.scan_timings = {}
+        if served is None:
+            start = time.perf_counter()
+            git_candidates = await loop.run_in_executor(None, self.find_directories)
+            self.scan_timings['find'] = time.perf_counter() - start
+        else:
+            served_dirs, self.regular_dirs = served
+            git_candidates = [git_dir.name for git_dir in served_dirs]
+        self.git_dirs = []
+        self.groups = [(None, "⚪", self.regular_dirs)] if self.regular_dirs else []
+        self.current_group_index = 0
+        self.changed_during_scan = set()
+        if self.watcher:
+            # Before scanning, so no change is missed
+            self.watcher.watch_workspace(self.current_dir, git_candidates)
+        if self.current_view == "main":
+            await self.show_main_view()
+        else:
+            # Another view was opened while finding the repos, the main view fills in behind it
+            self.update_grid()
+
+        try:
+            if served is None:
+                await self.scan_progressively(git_candidates)
+            else:
+                self.add_git_dirs(served_dirs)
+        finally:
+            self.is_scanning = False
+            self.follow_scan = False
+            self.sub_title = ""
+
+        if self.changed_during_scan:
+            # The scan may have read these before they changed
+            self.update_changed_dirs(self.changed_during_scan)
+            self.changed_during_scan = set()
+
+    def dirs_from_server(self) -> Optional[Tuple[List[GitDir], List[RegularDir]]]:
+        """The repos and regular directories as the workspace server sees them, None if it isn't running"""
+        if not self.socket_path:
+            return None
+        try:
+            return list_dirs_from_server(self.current_dir, self.depth, self.socket_path, GitDir)
+        except (OSError, ServerError):
+            return None
+
+    async def scan_progressively(self, git_candidates: List[str]) -> None:
+        """Scan the repos jobs at a time, adding them to the main view in batches as they finish"""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        cache = load_status_cache(self.cache_path) if self.cache_path else None
+        executor = ThreadPoolExecutor(max_workers=self.jobs)
+        try:
+            futures = {
+                loop.run_in_executor(executor, analyze_git_directory, name, cache): index
+                for index, name in enumerate(git_candidates)
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                self.sub_title = f"Scanning {len(futures) - len(pending)}/{len(futures)}"
+                # Everything that finished while the last batch was mounted is added at once, in directory order
+                results = [future.result() for future in sorted(done, key=futures.get)]
+                self.add_git_dirs([git_dir for git_dir in results if git_dir is not None])
+        finally:
+            # Don't wait for the remaining repos when a refresh cancelled this scan
+            executor.shutdown(wait=False, cancel_futures=True)
+        self.scan_timings['scan'] = time.perf_counter() - start
+        self.save_cache(cache)
+
+    def save_cache(self, cache: Optional[Dict[str, dict]]) -> None:
+        if self.cache_path:
+            # Forget repos that were deleted
+            save_status_cache(
+                self.cache_path, {path: entry for path, entry in cache.items() if Path(path, '.git').exists()}
+            )
+
+    def on_repos_changed(self, names: Set[str], rescan: bool) -> None:
+        """Called by the watcher with the repos that changed, or to ask for a full rescan"""
+        if rescan:
+            if self.current_view == "main":
+                self.load_directories()
+            else:
+                # Rescanning remounts the main view, leaving the detail or bulk view under way
+                self.rescan_pending = True
+        elif self.is_scanning:
+            self.changed_during_scan |= names
+        elif names:
+            self.update_changed_dirs(names)
+
+    def is_own_index(self, name: str) -> bool:
+        """Whether the index of repo name is still the one its last scan left"""
+        for git_dir in self.git_dirs:
+            if git_dir.name == name:
+                return git_dir.index_stat is not None and git_dir.index_stat == index_stat(name)
+        return False
+
+    @work(group="watch")
+    async def update_changed_dirs(self, names: Set[str]):
+        """Rescan only the given repos, and regroup if any of them changed group"""
+        git_dirs = [git_dir for git_dir in self.git_dirs if git_dir.name in names]
+        before = [(git_dir.sync_status, git_dir.working_dir_status) for git_dir in git_dirs]
+        loop = asyncio.get_running_loop()
+
+        async def rescan(git_dir: GitDir) -> None:
+            try:
+                await loop.run_in_executor(None, git_dir.analyze_status)
+            except ValueError:
+                # Removed, the workspace rescan that follows drops it
+                pass
+
+        await asyncio.gather(*(rescan(git_dir) for git_dir in git_dirs))
+        if before == [(git_dir.sync_status, git_dir.working_dir_status) for git_dir in git_dirs]:
+            return
+
+        if not self.is_scanning:
+            self.group_directories()
+            self.update_grid()
+
+    def find_directories(self) -> List[str]:
+        """Collect the regular directories of the workspace, and return the git repos in it"""
+        git_candidates, regular = find_dirs(self.depth, self.jobs)
+        self.regular_dirs = [RegularDir(path) for path in regular]
+        return git_candidates
+
+    def add_git_dirs(self, git_dirs: List[GitDir]) -> None:
+        """Add scanned repos to their groups, creating a group at its priority position for its first repo"""
+        priority = list(STATUS_PRIORITY_ORDER)
+        new_keys = set()
+        for git_dir in git_dirs:
+            self.git_dirs.append(git_dir)
+            key = (git_dir.sync_status, git_dir.working_dir_status)
+            keys = [group_key for group_key, _, _ in self.groups]
+            if key in keys:
+                self.groups[keys.index(key)][2].append(git_dir)
+            else:
+                group_index = sum(
+                    1 for group_key in keys if group_key is not None and priority.index(group_key) < priority.index(key)
+                )
+                self.groups.insert(group_index, (key, STATUS_PRIORITY_ORDER[key], [git_dir]))
+                new_keys.add(key)
+                if group_index <= self.current_group_index and len(self.groups) > 1:
+                    # Keep the same group selected
+                    self.current_group_index += 1
+
+        if self.follow_scan and self.grid and self.groups and (
+            self.grid.cursor_dir is None or self.groups[0][0] in new_keys
+        ):
+            self.current_group_index = 0
+            self.update_grid(self.groups[0][2][0])
+        else:
+            self.update_grid()
 
     def scan_directories(self):
         """Scan current directory for git repositories and regular directories"""
         self.git_dirs = []
-        self.regular_dirs = []
+
+        served = self.dirs_from_server()
+        self.scan_timings = {}
+        if served is not None:
+            self.git_dirs, self.regular_dirs = served
+            self.group_directories()
+            return
 
         try:
-            # Get all directories
-            all_dirs = [item for item in os.listdir('.') 
-                       if item.strip() and Path(item).is_dir()]
-            
-            # Separate git and regular directories
-            git_candidates = []
-            for item in all_dirs:
-                if Path(item, '.git').exists():
-                    git_candidates.append(item)
-                else:
-                    self.regular_dirs.append(RegularDir(item))
-            
-            # Process git directories with ThreadPoolExecutor
+            start = time.perf_counter()
+            git_candidates = self.find_directories()
+            found = time.perf_counter()
+
+            # Process git directories with ThreadPoolExecutor, their git subprocesses run in parallel
             if git_candidates:
-                # Calculate thread count: CPU cores / 2, max 4
-                cpu_count = os.cpu_count() or 4
-                thread_count = min(4, max(1, cpu_count // 2))
-                #raise Exception(f'total git dirs: {len(git_candidates)}, thread count: {thread_count}')
-                
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    results = list(executor.map(analyze_git_directory, git_candidates))
+                cache = load_status_cache(self.cache_path) if self.cache_path else None
+                with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                    results = list(executor.map(lambda name: analyze_git_directory(name, cache), git_candidates))
+                self.save_cache(cache)
                     
                 # Filter out None results and add to git_dirs
                 self.git_dirs = [git_dir for git_dir in results if git_dir is not None]
+            self.scan_timings = {'find': found - start, 'scan': time.perf_counter() - found}
                     
         except OSError:
             pass
 
-        # Group git dirs by status
+        self.group_directories()
+
+    def group_directories(self) -> None:
+        """Group self.git_dirs by status in priority order, with the regular directories last"""
         groups_dict = {}
         for git_dir in self.git_dirs:
             key = (git_dir.sync_status, git_dir.working_dir_status)
@@ -490,12 +1020,12 @@ class MyWorkspaceApp(App):
 
         if self.regular_dirs:
             self.groups.append((None, "⚪", self.regular_dirs))
+        self.current_group_index = min(self.current_group_index, max(0, len(self.groups) - 1))
 
     async def show_loading(self, message: str = "Loading..."):
         """Show loading indicator with message"""
         self.is_loading = True
-        container = self.query_one("#main-container")
-        await container.remove_children()
+        container = await self.clear_view()
         
         loading_container = Vertical(classes="loading-container")
         await container.mount(loading_container)
@@ -506,61 +1036,39 @@ class MyWorkspaceApp(App):
         await loading_container.mount(loading_text)
         await loading_container.mount(loading_indicator)
 
-    async def show_main_view(self):
-        """Show the main view"""
+    async def clear_view(self) -> Container:
+        """Remove the detail, bulk or loading view and hide the main view, returning the container of the views"""
+        container = self.query_one("#main-container")
+        await container.query("#main-container > *").exclude("#main-grid").remove()
+        if self.grid:
+            self.grid.display = False
+            self.set_focus(None)
+        return container
+
+    async def show_main_view(self, focus_dir=None):
+        """Show the main view, with the cursor on focus_dir if given and where it was otherwise"""
         self.current_view = "main"
         self.is_loading = False
-        container = self.query_one("#main-container")
-        await container.remove_children()
-
-        scroll_view = ScrollableContainer(id="main-scroll")
-        await container.mount(scroll_view)
-
-        self.group_widgets = []
-
-        for group_index, (group_key, emoji, dirs) in enumerate(self.groups):
-            # Add group title
-            if group_key:
-                sync_status, working_status = group_key
-                title_text = f"{emoji} {sync_status.value.title()} + {working_status.value.title()} ({len(dirs)})"
-            else:
-                title_text = f"{emoji} Non-Git Directories ({len(dirs)})"
-            
-            group_title = Label(title_text, classes="group-title")
-            if group_index == self.current_group_index:
-                group_title.add_class("selected")
-            await scroll_view.mount(group_title)
-            
-            # Create rows of directories (wrap every 6 items)
-            dirs_container = Vertical(classes="dirs-container")
-            await scroll_view.mount(dirs_container)
-            
-            # Add directory widgets in rows
-            group_dir_widgets = []
-            dirs_per_row = 6
-            for i in range(0, len(dirs), dirs_per_row):
-                row_dirs = dirs[i:i + dirs_per_row]
-                row_container = Horizontal(classes="directories-row")
-                await dirs_container.mount(row_container)
-                
-                for dir_obj in row_dirs:
-                    dir_widget = DirectoryWidget(dir_obj)
-                    group_dir_widgets.append(dir_widget)
-                    await row_container.mount(dir_widget)
-            
-            self.group_widgets.append(group_dir_widgets)
-
-        # Focus on first directory of current group
-        if self.groups and self.group_widgets:
-            if self.group_widgets[self.current_group_index]:
-                self.group_widgets[self.current_group_index][0].focus()
+        await self.clear_view()
+        self.grid.display = True
+        self.update_grid(focus_dir)
+        self.grid.focus()
+        if self.rescan_pending:
+            self.rescan_pending = False
+            self.load_directories()
+
+    def update_grid(self, focus_dir=None) -> None:
+        """Show self.groups in the main view, even while hidden, so that coming back to it is instant"""
+        if self.grid:
+            self.grid.set_groups(self.groups, self.current_group_index, focus_dir)
+            self.current_group_index = self.grid.group_index
 
     async def show_detail_view(self, git_dir: GitDir):
         """Show the detail view for a selected directory"""
+        self.follow_scan = False
         self.current_view = "detail"
         self.selected_dir = git_dir
-        container = self.query_one("#main-container")
-        await container.remove_children()
+        container = await self.clear_view()
 
         # Create scrollable container for detail view
         scroll_view = ScrollableContainer()
@@ -573,10 +1081,6 @@ class MyWorkspaceApp(App):
         title = Label(f"Directory Details", classes="section-title")
         await detail_view.mount(title)
 
-        # Interactive Shell section (initially hidden)
-        if self.shell_panel_visible:
-            await self._mount_shell_panel(detail_view, git_dir)
-
         # Git status DataTable (no container panel)
         status_table = DataTable(show_header=False, zebra_stripes=True, classes="status-table")
         status_table.cursor_type = "none"
@@ -596,7 +1100,7 @@ class MyWorkspaceApp(App):
             status_table.add_row("Ahead/Behind", f"{ahead}/{behind}")
 
         # Git operations section with back button
-        ops_section = Horizontal()
+        ops_section = Horizontal(id="ops-section")
         await detail_view.mount(ops_section)
         
         # Left side buttons
@@ -617,9 +1121,17 @@ class MyWorkspaceApp(App):
         right_buttons = Horizontal(classes="ops-buttons-right")
         await ops_section.mount(right_buttons)
         
+        cancel_btn = Button(
+            "Cancel", id="cancel", variant="error", classes="compact-button", disabled=not self.command_running
+        )
         back_btn = Button("Back", id="back", variant="default", classes="compact-button")
+        await right_buttons.mount(cancel_btn)
         await right_buttons.mount(back_btn)
 
+        # Interactive Shell section (initially hidden)
+        if self.shell_panel_visible:
+            await self._mount_shell_panel(detail_view, git_dir)
+
         # Detailed status section with border
         detail_status_section = Vertical(classes="detail-section")
         detail_status_section.border_title = "Detailed Status"
@@ -628,22 +1140,98 @@ class MyWorkspaceApp(App):
         if git_dir.detailed_status:
             detailed_status.write(git_dir.detailed_status)
         else:
-            detailed_status.write("No detailed status available")
+            detailed_status.write("Loading...")
+            self.load_detailed_status(git_dir)
         await detail_status_section.mount(detailed_status)
 
-        # Operation result section
+        # Operation output section
         if self.operation_result:
-            result_section = Static(f"Operation Result:\n{self.operation_result}", classes="operation-result")
-            await detail_view.mount(result_section)
+            operation_log = await self._operation_log()
+            for line in self.operation_result.splitlines():
+                operation_log.write(line)
+
+    @work(group="detail")
+    async def load_detailed_status(self, git_dir: GitDir):
+        """Scan a repo whose status came from the workspace server, which doesn't send detailed statuses"""
+        before = (git_dir.sync_status, git_dir.working_dir_status)
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, git_dir.analyze_status)
+        except ValueError:
+            # No longer a repo
+            return
+        if (git_dir.sync_status, git_dir.working_dir_status) != before:
+            self.group_directories()
+            self.update_grid()
+        if self.current_view == "detail" and self.selected_dir is git_dir:
+            await self.show_detail_view(git_dir)
+
+    async def _operation_log(self) -> RichLog:
+        """The log git operations stream their output into, added to the detail view on first use"""
+        try:
+            return self.query_one("#operation-log", RichLog)
+        except NoMatches:
+            operation_log = RichLog(id="operation-log", classes="operation-result operation-log")
+            await self.query_one(".detail-view").mount(operation_log)
+            return operation_log
+
+    def _set_command_running(self, running: bool) -> None:
+        self.command_running = running
+        try:
+            self.query_one("#cancel", Button).disabled = not running
+        except NoMatches:
+            pass
+
+    async def show_bulk_view(self, operation: str, title: str, git_dirs: List[GitDir]):
+        """Show the progress of a git operation over a group, one row per repo"""
+        self.current_view = "bulk"
+        container = await self.clear_view()
+
+        bulk_view = Vertical(classes="detail-view")
+        await container.mount(bulk_view)
+        await bulk_view.mount(Label(f"git {operation}: {title}", classes="section-title"))
+        await bulk_view.mount(Label("", id="bulk-summary"))
+
+        table = DataTable(id="bulk-table", zebra_stripes=True, classes="bulk-table")
+        table.cursor_type = "none"
+        await bulk_view.mount(table)
+        table.add_column("Directory", key="repo")
+        table.add_column("Result", key="result", width=24)
+        table.add_column("Output", key="output")
+        for git_dir in git_dirs:
+            table.add_row(git_dir.name, "queued", "", key=git_dir.name)
+
+    async def show_timings_view(self):
+        """Show how long the last scan took, and the time of each step for each repo, slowest first"""
+        self.follow_scan = False
+        self.current_view = "timings"
+        container = await self.clear_view()
+
+        timings_view = Vertical(classes="detail-view")
+        await container.mount(timings_view)
+        await timings_view.mount(Label("Scan Timings", classes="section-title"))
+        await timings_view.mount(Label(timings_summary(self.git_dirs, self.scan_timings, self.jobs)))
+
+        table = DataTable(zebra_stripes=True, classes="bulk-table")
+        table.cursor_type = "none"
+        await timings_view.mount(table)
+        table.add_column("Time", width=9)
+        table.add_column("Directory")
+        table.add_column("Steps")
+        # Repos the server answered for have no timings, until they are scanned here
+        timed_dirs = [git_dir for git_dir in self.git_dirs if git_dir.timings]
+        for git_dir in sorted(timed_dirs, key=lambda git_dir: git_dir.scan_time, reverse=True):
+            steps = ", ".join(f"{step} {seconds:.3f}s" for step, seconds in git_dir.timings.items())
+            table.add_row(f"{git_dir.scan_time:.3f}s", git_dir.name, steps)
+        table.focus()
 
     async def _mount_shell_panel(self, detail_view: Vertical, git_dir: GitDir):
         """Mount the interactive shell panel"""
         shell_section = Vertical(classes="shell-panel", id="shell-panel")
         shell_section.border_title = "Interactive Shell"
         
-        # Find the position after the operations section
-        ops_section = detail_view.children[-3]  # Should be the operations section (3rd from end: ops, detailed status, back button)
-        detail_view.mount(shell_section, after=ops_section)
+        # Right after the operations section
+        ops_section = detail_view.query_one("#ops-section")
+        await detail_view.mount(shell_section, after=ops_section)
         
         # Shell input
         shell_input = Input(placeholder="Enter command...", id="shell-input", classes="shell-input")
@@ -663,38 +1251,73 @@ class MyWorkspaceApp(App):
         # Set focus to shell input
         shell_input.focus()
 
-    @on(Click, "DirectoryWidget")
-    async def on_directory_click(self, event: Click) -> None:
+    @on(DirectoryGrid.Selected)
+    async def on_directory_click(self, event: DirectoryGrid.Selected) -> None:
         """Handle directory clicks"""
-        if hasattr(event.widget, 'dir_obj') and isinstance(event.widget.dir_obj, GitDir):
-            await self.show_detail_view(event.widget.dir_obj)
+        self.follow_scan = False
+        self.current_group_index = self.grid.group_index
+        if isinstance(event.dir_obj, GitDir):
+            await self.show_detail_view(event.dir_obj)
 
     @on(Button.Pressed, "#pull")
     async def handle_pull(self) -> None:
         if self.selected_dir:
-            await self.show_loading(f"Running git pull in {self.selected_dir.name}...")
-            self.perform_git_operation("pull")
+            self.start_git_operation("pull")
 
-    @work
+    def start_git_operation(self, operation: str) -> None:
+        if self.command_running:
+            self.notify("Another command is still running, cancel it with Escape", severity="warning")
+            return
+        self._set_command_running(True)
+        self.perform_git_operation(operation)
+
+    @work(group="command")
     async def perform_git_operation(self, operation: str):
-        """Perform git operation in background"""
-        if self.selected_dir:
-            result = await self.selected_dir.git_operation(operation)
-            self.operation_result = result
-            self.selected_dir.analyze_status()
-            await self.show_detail_view(self.selected_dir)
+        """Perform git operation in background, streaming its output into the operation log"""
+        git_dir = self.selected_dir
+        self.operation_result = ""
+        operation_log: Optional[RichLog] = None
+
+        def write(line: str, is_stderr: bool = False) -> None:
+            self.operation_result += line + "\n"
+            if operation_log:
+                operation_log.write(line)
+
+        try:
+            operation_log = await self._operation_log()
+            write(f"$ git {operation}")
+            returncode = await git_dir.git_operation(operation, write)
+            if returncode:
+                write(f"git {operation} exited with code {returncode}")
+        except NoMatches:
+            # The detail view was left before the operation started
+            return
+        except asyncio.CancelledError:
+            write(f"git {operation} cancelled")
+            raise
+        except OSError as e:
+            write(f"Error: {e}")
+        finally:
+            self._set_command_running(False)
+
+        # Status after the operation, rescanned without blocking the UI
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, git_dir.analyze_status)
+        except ValueError:
+            # No longer a repo
+            return
+        if self.current_view == "detail" and self.selected_dir is git_dir:
+            await self.show_detail_view(git_dir)
 
     @on(Button.Pressed, "#push")
     async def handle_push(self) -> None:
         if self.selected_dir:
-            await self.show_loading(f"Running git push in {self.selected_dir.name}...")
-            self.perform_git_operation("push")
+            self.start_git_operation("push")
 
     @on(Button.Pressed, "#fetch")
     async def handle_fetch(self) -> None:
         if self.selected_dir:
-            await self.show_loading(f"Running git fetch in {self.selected_dir.name}...")
-            self.perform_git_operation("fetch")
+            self.start_git_operation("fetch")
 
     @on(Button.Pressed, "#toggle-shell")
     async def handle_toggle_shell(self) -> None:
@@ -736,50 +1359,147 @@ class MyWorkspaceApp(App):
             shell_output.write(f"$ {command}")
             
             # Execute command using worker
+            if self.command_running:
+                self.notify("Another command is still running, cancel it with Escape", severity="warning")
+                return
+            self._set_command_running(True)
             self.execute_shell_command(command, shell_output)
 
-    @work
+    @work(group="command")
     async def execute_shell_command(self, command: str, shell_output: RichLog):
-        """Execute shell command in the selected directory"""
+        """Execute shell command in the selected directory, streaming its output"""
         if not self.selected_dir:
+            self._set_command_running(False)
             return
-            
+
+        def write(line: str, is_stderr: bool) -> None:
+            if is_stderr:
+                report(f"ERROR: {line}")
+            else:
+                shell_output.write(line)
+                self.shell_output.append(line)
+
+        def report(message: str) -> None:
+            shell_output.write(Text(message, style="red"))
+            self.shell_output.append(message)
+
         try:
-            with cdctx(self.selected_dir.name):
-                # Execute the command
-                result = subprocess.run(
-                    command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=30  # 30 second timeout
-                )
-                
-                # Display output
-                if result.stdout:
-                    for line in result.stdout.strip().split('\n'):
-                        shell_output.write(line)
-                        self.shell_output.append(line)
-                
-                if result.stderr:
-                    for line in result.stderr.strip().split('\n'):
-                        shell_output.write(f"[red]ERROR: {line}[/red]")
-                        self.shell_output.append(f"ERROR: {line}")
-                
-                if result.returncode != 0:
-                    shell_output.write(f"[red]Command exited with code {result.returncode}[/red]")
-                    self.shell_output.append(f"Command exited with code {result.returncode}")
-                    
-        except subprocess.TimeoutExpired:
-            shell_output.write("[red]Command timed out after 30 seconds[/red]")
-            self.shell_output.append("Command timed out after 30 seconds")
+            returncode = await run_streaming(command, write, cwd=self.selected_dir.name, shell=True)
+            if returncode != 0:
+                report(f"Command exited with code {returncode}")
+        except asyncio.CancelledError:
+            report("Command cancelled")
+            raise
         except Exception as e:
-            shell_output.write(f"[red]Error executing command: {str(e)}[/red]")
-            self.shell_output.append(f"Error executing command: {str(e)}")
+            report(f"Error executing command: {e}")
+        finally:
+            self._set_command_running(False)
+
+    async def action_fetch_group(self) -> None:
+        """Fetch every repo of the selected group"""
+        await self.start_group_operation("fetch")
+
+    async def action_pull_group(self) -> None:
+        """Pull every repo of the selected group"""
+        await self.start_group_operation("pull")
+
+    async def start_group_operation(self, operation: str) -> None:
+        if self.current_view != "main" or not self.groups:
+            return
+        if self.is_scanning:
+            self.notify("Wait for the scan to finish", severity="warning")
+            return
+        if self.command_running:
+            self.notify("Another command is still running, cancel it with Escape", severity="warning")
+            return
+        group_key, emoji, dirs = self.groups[self.current_group_index]
+        if group_key is None:
+            self.notify("These are not git repositories", severity="warning")
+            return
+
+        await self.show_bulk_view(operation, group_title_text(group_key, emoji, len(dirs)), list(dirs))
+        self._set_command_running(True)
+        self.run_group_operation(operation, list(dirs))
+
+    @work(group="command")
+    async def run_group_operation(self, operation: str, git_dirs: List[GitDir]):
+        """Run git <operation> in every repo of a group, fetch_jobs at a time, rescanning each repo it ran in"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.fetch_jobs)
+        results: Dict[str, str] = {}
+
+        def progress() -> str:
+            failed = sum(1 for result in results.values() if result != "done")
+            return f"{len(results)}/{len(git_dirs)} finished, {failed} failed"
+
+        async def run(git_dir: GitDir) -> None:
+            async with semaphore:
+                table.update_cell(git_dir.name, "result", "running")
+
+                def write(line: str, is_stderr: bool) -> None:
+                    # Only the latest line fits in the row
+                    if line.strip():
+                        table.update_cell(git_dir.name, "output", line.strip())
+
+                try:
+                    returncode = await asyncio.wait_for(git_dir.git_operation(operation, write), self.fetch_timeout)
+                    result = "done" if returncode == 0 else f"failed ({returncode})"
+                except asyncio.TimeoutError:
+                    result = f"timed out after {self.fetch_timeout:g}s"
+                except OSError as e:
+                    result = f"failed: {e}"
+
+            # Only the repos the operation ran in need a new status
+            try:
+                await loop.run_in_executor(None, git_dir.analyze_status)
+            except ValueError:
+                result = "no longer a repository"
+            results[git_dir.name] = result
+            table.update_cell(git_dir.name, "result", result)
+            summary.update(progress())
+
+        try:
+            table = self.query_one("#bulk-table", DataTable)
+            summary = self.query_one("#bulk-summary", Label)
+            summary.update(progress())
+            await asyncio.gather(*(run(git_dir) for git_dir in git_dirs))
+        except NoMatches:
+            # The bulk view was left before the operation started
+            return
+        except asyncio.CancelledError:
+            for git_dir in git_dirs:
+                if git_dir.name not in results:
+                    table.update_cell(git_dir.name, "result", "cancelled")
+            raise
+        finally:
+            self._set_command_running(False)
+            # Repos may have moved to another group
+            self.group_directories()
+        summary.update(f"{progress()}, press Backspace to go back")
+
+    @on(Button.Pressed, "#cancel")
+    async def handle_cancel(self) -> None:
+        await self.action_cancel()
+
+    async def action_cancel(self) -> None:
+        """Cancel the running git operation or shell command"""
+        if self.command_running:
+            self.workers.cancel_group(self, "command")
+
+    async def action_show_timings(self) -> None:
+        if self.current_view == "main":
+            await self.show_timings_view()
 
     async def action_back(self) -> None:
         """Handle backspace key"""
-        if self.current_view == "detail":
+        if self.current_view == "timings":
+            await self.show_main_view()
+        elif self.current_view == "bulk":
+            if self.command_running:
+                self.notify("Still running, cancel it with Escape first", severity="warning")
+            else:
+                await self.show_main_view()
+        elif self.current_view == "detail":
             self.operation_result = ""
             self.shell_output = []  # Clear shell output when going back
             self.shell_panel_visible = False  # Reset shell panel state
@@ -787,6 +1507,11 @@ class MyWorkspaceApp(App):
 
     async def action_refresh(self) -> None:
         """Refresh the directory scan"""
+        if self.current_view in ("bulk", "timings"):
+            return
+        if self.current_view == "main":
+            self.load_directories()
+            return
         await self.show_loading("Refreshing directories...")
         self.refresh_directories()
 
@@ -794,81 +1519,89 @@ class MyWorkspaceApp(App):
     async def refresh_directories(self):
         """Refresh directories in background"""
         await asyncio.sleep(0.1)  # Give UI time to update
-        self.scan_directories()
+        loop = asyncio.get_running_loop()
+        # Off the event loop, the workspace server may take a while to answer
+        await loop.run_in_executor(None, self.scan_directories)
         if self.current_view == "main":
             await self.show_main_view()
         elif self.current_view == "detail" and self.selected_dir:
-            self.selected_dir.analyze_status()
+            try:
+                await loop.run_in_executor(None, self.selected_dir.analyze_status)
+            except ValueError:
+                # No longer a repo
+                await self.show_main_view()
+                return
             await self.show_detail_view(self.selected_dir)
 
     async def action_select(self) -> None:
         """Handle enter key"""
-        if self.current_view == "main":
-            focused = self.focused
-            if isinstance(focused, DirectoryWidget) and isinstance(focused.dir_obj, GitDir):
-                await self.show_detail_view(focused.dir_obj)
-
-    async def update_group_selection(self) -> None:
-        """Update group title selection without rebuilding the entire UI"""
-        try:
-            # Find all group title labels and update their selection state
-            group_titles = self.query(".group-title")
-            for index, title in enumerate(group_titles):
-                if index == self.current_group_index:
-                    title.add_class("selected")
-                else:
-                    title.remove_class("selected")
-            
-            # Focus on first directory of current group
-            if self.groups and self.group_widgets:
-                if self.group_widgets[self.current_group_index]:
-                    self.group_widgets[self.current_group_index][0].focus()
-        except Exception:
-            # Fallback to full refresh if update fails
-            await self.show_main_view()
+        if self.current_view == "main" and isinstance(self.grid.cursor_dir, GitDir):
+            await self.show_detail_view(self.grid.cursor_dir)
 
     async def action_next_group(self) -> None:
         """Move to next group and focus first directory"""
+        self.follow_scan = False
         if self.current_view == "main" and self.groups:
             self.current_group_index = (self.current_group_index + 1) % len(self.groups)
-            await self.update_group_selection()
+            self.grid.select_group(self.current_group_index)
 
     async def action_prev_group(self) -> None:
         """Move to previous group and focus first directory"""
+        self.follow_scan = False
         if self.current_view == "main" and self.groups:
             self.current_group_index = (self.current_group_index - 1) % len(self.groups)
-            await self.update_group_selection()
-
+            self.grid.select_group(self.current_group_index)
 
     def action_move_left(self) -> None:
         """Move focus left within current group"""
-        if self.current_view == "main" and self.group_widgets:
-            current_group = self.group_widgets[self.current_group_index]
-            if current_group:
-                focused = self.focused
-                if isinstance(focused, DirectoryWidget) and focused in current_group:
-                    current_index = current_group.index(focused)
-                    if current_index > 0:
-                        current_group[current_index - 1].focus()
-                    else:
-                        current_group[-1].focus()  # Wrap to end
+        self.follow_scan = False
+        if self.current_view == "main":
+            self.grid.move_cursor(-1)
 
     def action_move_right(self) -> None:
         """Move focus right within current group"""
-        if self.current_view == "main" and self.group_widgets:
-            current_group = self.group_widgets[self.current_group_index]
-            if current_group:
-                focused = self.focused
-                if isinstance(focused, DirectoryWidget) and focused in current_group:
-                    current_index = current_group.index(focused)
-                    if current_index + 1 < len(current_group):
-                        current_group[current_index + 1].focus()
-                    else:
-                        current_group[0].focus()  # Wrap to beginning
+        self.follow_scan = False
+        if self.current_view == "main":
+            self.grid.move_cursor(1)
 
 
 def main():
-    app = MyWorkspaceApp()
+    parser = argparse.ArgumentParser(description='Browse the git status of every repository in the current directory')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=DEFAULT_JOBS,
+        help=f'Number of repositories to scan at once (default: {DEFAULT_JOBS})'
+    )
+    parser.add_argument(
+        '--fetch-jobs', type=int, default=DEFAULT_FETCH_JOBS,
+        help=f'Number of repositories fetched or pulled at once by the group actions (default: {DEFAULT_FETCH_JOBS})'
+    )
+    parser.add_argument(
+        '--fetch-timeout', type=float, default=DEFAULT_FETCH_TIMEOUT,
+        help=f'Seconds each repository may take in the group actions (default: {DEFAULT_FETCH_TIMEOUT})'
+    )
+    parser.add_argument(
+        '-d', '--depth', type=int, default=DEFAULT_DEPTH,
+        help=f'Directory levels to look down for repositories, like 3 for org/team/repo (default: {DEFAULT_DEPTH})'
+    )
+    parser.add_argument(
+        '--cache', action='store_true',
+        help=f'Reuse the statuses of unchanged repositories from {STATUS_CACHE_PATH}, which is only faster '
+        'where git status is slower than walking the worktree'
+    )
+    parser.add_argument(
+        '--socket', help=f'Socket of the workspace server, myworkspace.py --server (default: {default_socket_path()})'
+    )
+    parser.add_argument(
+        '--no-server', dest='use_server', action='store_false',
+        help='Scan in this process even if a workspace server is running'
+    )
+    args = parser.parse_args()
+
+    app = MyWorkspaceApp(
+        jobs=args.jobs, fetch_jobs=args.fetch_jobs, fetch_timeout=args.fetch_timeout, depth=args.depth,
+        socket_path=(args.socket or default_socket_path()) if args.use_server else None,
+        cache_path=STATUS_CACHE_PATH if args.cache else None
+    )
     app.run()
 
 
@@ -13,12 +13,20 @@ Tests all the formatting rules:
 import unittest
 import tempfile
 import os
+import time
+import json
+import shutil
+import socket
+import argparse
+import subprocess
+import threading
 from pathlib import Path
 import sys
 
 # Import the module we're testing
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import mdformat
+import mdformat_client
 
 
 class TestMarkdownFormatter(unittest.TestCase):
@@ -55,6 +63,26 @@ class TestMarkdownFormatter(unittest.TestCase):
         self.assertFalse(mdformat.is_list_item('> Blockquote'))
         self.assertFalse(mdformat.is_list_item(''))
 
+    def test_classify_line(self):
+        """Test the per-line classification shared by all rules."""
+        self.assertEqual(mdformat.classify_line(''), (mdformat.BLANK, 0))
+        self.assertEqual(mdformat.classify_line('   '), (mdformat.BLANK, 0))
+        self.assertEqual(mdformat.classify_line('## Heading'), (mdformat.HEADING, 0))
+        self.assertEqual(mdformat.classify_line('  > Quote'), (mdformat.QUOTE, 2))
+        self.assertEqual(mdformat.classify_line('    - Item'), (mdformat.BULLET, 4))
+        self.assertEqual(mdformat.classify_line('12) Item'), (mdformat.ORDERED, 0))
+        self.assertEqual(mdformat.classify_line('```python'), (mdformat.FENCE, 0))
+        self.assertEqual(mdformat.classify_line('-not a list'), (mdformat.TEXT, 0))
+        self.assertEqual(mdformat.classify_line('\tText'), (mdformat.TEXT, 1))
+
+    def test_line_table_keeps_classification(self):
+        """Test that rules carry kinds and indents along with rewritten lines."""
+        table = mdformat.LineTable.from_lines(['- Item', '  - Sub', '', 'Text'])
+        result = mdformat.format_list_lines(table)
+        self.assertEqual(result.lines, ['- Item', '    - Sub', '', 'Text'])
+        self.assertEqual(list(result.kinds), [mdformat.BULLET, mdformat.BULLET, mdformat.BLANK, mdformat.TEXT])
+        self.assertEqual(list(result.indents), [0, 4, 0, 0])
+
     def test_get_list_indentation(self):
         """Test getting indentation level of list items."""
         self.assertEqual(mdformat.get_list_indentation('- Item'), 0)
@@ -429,6 +457,519 @@ More text"""
             os.unlink(output_file_path)
 
 
+class TestRecursive(unittest.TestCase):
+    def run_main(self, *args):
+        from io import StringIO
+
+        original_argv = sys.argv
+        original_stdout = sys.stdout
+        sys.argv = ['mdformat.py', *args]
+        sys.stdout = StringIO()
+        try:
+            try:
+                mdformat.main()
+                code = 0
+            except SystemExit as e:
+                code = e.code
+            return code, sys.stdout.getvalue()
+        finally:
+            sys.stdout = original_stdout
+            sys.argv = original_argv
+
+    def test_find_markdown_files(self):
+        """Test that only *.md files outside hidden directories are found."""
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ['a.md', 'b.txt', 'sub/c.md', '.obsidian/d.md']:
+                path = Path(tmp, name)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text('x\n')
+
+            self.assertEqual(mdformat.find_markdown_files(tmp), ['a.md', os.path.join('sub', 'c.md')])
+
+    def test_recursive_in_place(self):
+        """Test formatting a directory tree in place with a process pool."""
+        with tempfile.TemporaryDirectory() as tmp:
+            messy = Path(tmp, 'notes', 'messy.md')
+            clean = Path(tmp, 'clean.md')
+            messy.parent.mkdir()
+            messy.write_text('# Title\n- Item 1\n\n- Item 2\n')
+            clean.write_text('# Title\n\nText\n')
+            messy.chmod(0o600)
+
+            code, output = self.run_main('--recursive', tmp, '--jobs', '2', '--in-place')
+
+            self.assertEqual(code, 0)
+            self.assertEqual(messy.read_text(), '# Title\n\n- Item 1\n- Item 2\n')
+            self.assertEqual(clean.read_text(), '# Title\n\nText\n')
+            self.assertEqual(messy.stat().st_mode & 0o777, 0o600)
+            self.assertIn('1 files changed, 1 files unchanged', output)
+            # No temporary files are left behind
+            self.assertEqual(sorted(p.name for p in messy.parent.iterdir()), ['messy.md'])
+
+    def test_recursive_check(self):
+        """Test that --check reports files that would change without writing them."""
+        with tempfile.TemporaryDirectory() as tmp:
+            messy = Path(tmp, 'messy.md')
+            messy.write_text('- Item 1\n\n- Item 2\n')
+
+            code, output = self.run_main('--recursive', tmp, '--check', '--jobs', '1')
+
+            self.assertEqual(code, 1)
+            self.assertIn(f'Would reformat {messy}', output)
+            self.assertEqual(messy.read_text(), '- Item 1\n\n- Item 2\n')
+
+    def test_recursive_cache(self):
+        """Test that files recorded in the cache are skipped without being read."""
+        with tempfile.TemporaryDirectory() as tmp:
+            note = Path(tmp, 'note.md')
+            note.write_text('# Title\n\nText\n')
+            # Files modified within the last seconds are not cached yet
+            old = time.time() - 60
+            os.utime(note, (old, old))
+
+            code, output = self.run_main('--recursive', tmp, '--check', '--jobs', '1')
+            self.assertEqual(code, 0)
+            self.assertIn('(0 cached)', output)
+            self.assertTrue(Path(tmp, mdformat.CACHE_FILENAME).exists())
+
+            original_format_markdown = mdformat.format_markdown
+            # Formatting would fail if the cached file were parsed again
+            mdformat.format_markdown = None
+            try:
+                code, output = self.run_main('--recursive', tmp, '--check', '--jobs', '1')
+            finally:
+                mdformat.format_markdown = original_format_markdown
+            self.assertEqual(code, 0)
+            self.assertIn('1 files unchanged (1 cached)', output)
+
+            # A modified file is formatted again
+            note.write_text('# Title\nText\n')
+            code, output = self.run_main('--recursive', tmp, '--check', '--jobs', '1')
+            self.assertEqual(code, 1)
+            self.assertIn('(0 cached)', output)
+
+    def test_recursive_requires_in_place(self):
+        """Test that --recursive refuses to run without --in-place."""
+        from io import StringIO
+
+        original_stderr = sys.stderr
+        sys.stderr = StringIO()
+        try:
+            code, _ = self.run_main('--recursive', '.')
+        finally:
+            sys.stderr = original_stderr
+        self.assertEqual(code, 2)
+
+
+@unittest.skipUnless(shutil.which('git'), 'git is not installed')
+class TestStaged(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.original_cwd = os.getcwd()
+        subprocess.run(['git', 'init', '-q'], cwd=self.root, check=True)
+        os.chdir(self.root)
+
+    def tearDown(self):
+        os.chdir(self.original_cwd)
+        self.tmp.cleanup()
+
+    def stage(self, files):
+        for name, content in files.items():
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(content, encoding='utf-8')
+        subprocess.run(['git', 'add', *files], check=True)
+
+    def staged_content(self, name):
+        return subprocess.run(['git', 'show', f':{name}'], check=True, capture_output=True, text=True).stdout
+
+    def test_staged_check(self):
+        """Test that --staged --check reports staged files that would change, without writing."""
+        self.stage({'a.md': 'A  \n', 'notes/b.md': '# B\n', 'c.txt': 'C  \n'})
+        code, output = TestRecursive.run_main(self, '--staged', '--check')
+
+        self.assertEqual(code, 1)
+        self.assertIn('Would reformat a.md', output)
+        self.assertNotIn('notes/b.md', output)
+        self.assertEqual(self.staged_content('a.md'), 'A  \n')
+
+    def test_staged_in_place(self):
+        """Test that --staged --in-place stages the formatted content and keeps unstaged changes."""
+        self.stage({'a.md': '# A\ntext\n', 'notes/b.md': '- b\n\n- c\n', 'c.md': 'Done\n'})
+        (self.root / 'notes/b.md').write_text('- b\n\n- c\n- unstaged\n', encoding='utf-8')
+        code, output = TestRecursive.run_main(self, '--staged', '--in-place', '--jobs', '2')
+
+        self.assertEqual(code, 0)
+        self.assertIn('2 files changed, 1 files unchanged', output)
+        self.assertEqual(self.staged_content('a.md'), '# A\n\ntext\n')
+        self.assertEqual((self.root / 'a.md').read_text(encoding='utf-8'), '# A\n\ntext\n')
+        self.assertEqual(self.staged_content('notes/b.md'), '- b\n- c\n')
+        self.assertEqual((self.root / 'notes/b.md').read_text(encoding='utf-8'), '- b\n\n- c\n- unstaged\n')
+
+    def test_read_blobs(self):
+        """Test reading several blobs, including an empty one, through one cat-file process."""
+        self.stage({'a.md': 'A\n', 'empty.md': '', 'b.md': 'B\nB\n'})
+        staged = mdformat.staged_markdown_files(str(self.root))
+        self.assertEqual([path for path, _, _ in staged], ['a.md', 'b.md', 'empty.md'])
+        blobs = mdformat.read_blobs(str(self.root), [blob_id for _, _, blob_id in staged])
+        self.assertEqual(blobs, [b'A\n', b'B\nB\n', b''])
+
+
+class TestStreaming(unittest.TestCase):
+    DOCUMENTS = [
+        '',
+        '\n\n\n\n',
+        '\n\n\nText\n\n\n',
+        '- Item 1\n\n- Item 2\n\n\n',
+        '# Heading\nParagraph\n> Quote\n> More\n- List\n  - Sub\n\n    Continuation\n1. Ordered\nText',
+        '1. foo\n\n   - foo 0\n   - foo 1\n\n2. bar\n\n   - bar 0\n- other type\n',
+        '- a\n    - b\n        - c\n    1. d\n- e\n\n\n\n\tTabbed\n```\ncode\n```\nEnd   ',
+    ]
+
+    @staticmethod
+    def random_document(rng):
+        pieces = ['', '', '   ', '- item', '* item', '1. item', '2) item', '# heading', '> quote', '```',
+                  'text', '  continuation', '\ttabbed', '-not a list']
+        lines = []
+        for _ in range(rng.randint(0, 40)):
+            line = ' ' * rng.choice([0, 0, 1, 2, 4, 6, 8]) + rng.choice(pieces)
+            lines.append(line + rng.choice(['', '', '  ']))
+        return '\n'.join(lines) + rng.choice(['', '\n', '\n\n\n'])
+
+    def assert_stream_matches(self, content):
+        expected = mdformat.format_markdown(content)
+        from io import StringIO
+
+        self.assertEqual(''.join(mdformat.format_markdown_stream(StringIO(content))), expected)
+        self.assertEqual(''.join(mdformat.format_markdown_stream(content.split('\n'))), expected)
+
+    def test_stream_matches_batch(self):
+        """Test that streaming produces the same output as format_markdown."""
+        for content in self.DOCUMENTS:
+            with self.subTest(content=content):
+                self.assert_stream_matches(content)
+
+    def test_stream_matches_batch_random(self):
+        """Test streaming against format_markdown on generated documents."""
+        import random
+
+        rng = random.Random(42)
+        for _ in range(2000):
+            content = self.random_document(rng)
+            with self.subTest(content=content):
+                self.assert_stream_matches(content)
+
+    def test_stream_is_lazy(self):
+        """Test that output starts before the input has been read to the end."""
+        consumed = []
+
+        def lines():
+            for i in range(1000):
+                consumed.append(i)
+                yield f'Paragraph {i}\n'
+
+        output = mdformat.format_markdown_stream(lines())
+        self.assertEqual(next(output), 'Paragraph 0\n')
+        self.assertLess(len(consumed), 10)
+
+    def test_stream_cli(self):
+        """Test the --stream command line mode with files."""
+        content = '# Title\n- Item 1\n\n- Item 2\n  - Sub\nText   \n\n\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = Path(tmp, 'in.md')
+            output_path = Path(tmp, 'out.md')
+            input_path.write_text(content, encoding='utf-8')
+
+            from io import StringIO
+
+            original_argv = sys.argv
+            original_stdout = sys.stdout
+            sys.argv = ['mdformat.py', '--stream', str(input_path), str(output_path)]
+            sys.stdout = StringIO()
+            try:
+                mdformat.main()
+            finally:
+                sys.stdout = original_stdout
+                sys.argv = original_argv
+
+            self.assertEqual(output_path.read_text(encoding='utf-8'), mdformat.format_markdown(content))
+
+
+class TestRanges(unittest.TestCase):
+    CONTENT = '# Title\nIntro   \n\n\n\n- a\n\n- b\n      - c\n\nMiddle  \n# Second\nText\n\n\n\nLast   \n'
+
+    def test_split_blocks(self):
+        """Test that blocks start at column-0 headings and column-0 lines after an empty line."""
+        table = mdformat.strip_lines(self.CONTENT)
+        starts = [start for start, _ in mdformat.split_blocks(table)]
+        self.assertEqual(starts, [0, 10, 11, 16])
+
+    def test_format_only_changed_block(self):
+        """Test that lines outside the given ranges are left as they are."""
+        result = mdformat.format_markdown_ranges(self.CONTENT, [(7, 7)])
+        expected = '# Title\n\nIntro\n\n- a\n- b\n    - c\n\nMiddle  \n# Second\nText\n\n\n\nLast   \n'
+        self.assertEqual(result, expected)
+
+        result = mdformat.format_markdown_ranges(self.CONTENT, [(13, 14)])
+        expected = '# Title\nIntro   \n\n\n\n- a\n\n- b\n      - c\n\nMiddle  \n# Second\n\nText\n\nLast   \n'
+        self.assertEqual(result, expected)
+        self.assertEqual(mdformat.format_markdown_ranges(self.CONTENT, []), self.CONTENT)
+
+    def test_ranges_match_full_format(self):
+        """Test that formatting every block gives the same result as format_markdown."""
+        import random
+
+        rng = random.Random(7)
+        for _ in range(2000):
+            content = TestStreaming.random_document(rng)
+            with self.subTest(content=content):
+                full = mdformat.format_markdown(content)
+                self.assertEqual(mdformat.format_markdown_ranges(content, [(1, content.count('\n') + 1)]), full)
+                # Formatting what's left after a partial pass ends at the same place
+                partial = mdformat.format_markdown_ranges(content, [(3, 5)])
+                self.assertEqual(mdformat.format_markdown(partial), full)
+
+    def test_parse_line_range(self):
+        self.assertEqual(mdformat.parse_line_range('120-180'), (120, 180))
+        self.assertEqual(mdformat.parse_line_range('7'), (7, 7))
+        for text in ['0-3', '5-2', 'a-b', '']:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                mdformat.parse_line_range(text)
+
+    @unittest.skipUnless(shutil.which('git'), 'git is not installed')
+    def test_git_diff_in_place(self):
+        """Test --git-diff --in-place against a file committed in a temporary repository."""
+        committed = '# One\nText  \n\n\n\n# Two\nMore\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, 'notes.md')
+            path.write_text(committed, encoding='utf-8')
+            git = ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com']
+            subprocess.run(['git', 'init', '-q'], cwd=tmp, check=True)
+            subprocess.run(git + ['add', 'notes.md'], cwd=tmp, check=True)
+            subprocess.run(git + ['commit', '-q', '-m', 'notes'], cwd=tmp, check=True)
+
+            path.write_text(committed + 'Added  \n', encoding='utf-8')
+            self.assertEqual(mdformat.git_changed_ranges(str(path)), [(8, 8)])
+
+            code, _ = TestRecursive.run_main(self, '--git-diff', '--in-place', str(path))
+            self.assertEqual(code, 0)
+            self.assertEqual(path.read_text(encoding='utf-8'), '# One\nText  \n\n\n\n# Two\n\nMore\nAdded\n')
+
+            untracked = Path(tmp, 'new.md')
+            untracked.write_text('New\n', encoding='utf-8')
+            self.assertEqual(mdformat.git_changed_ranges(str(untracked)), [(1, float('inf'))])
+
+
+class TestParallel(unittest.TestCase):
+    def test_next_block_start(self):
+        """Test finding the next line split_blocks() starts a block at."""
+        content = '\n\n# A\ntext\n- a\n\n- b\n\nafter\n# B\n'
+        first_content = content.index('#')
+        self.assertEqual(mdformat.next_block_start(content, 0, first_content), content.index('after'))
+        self.assertEqual(mdformat.next_block_start(content, content.index('fter'), first_content), content.index('# B'))
+        self.assertEqual(mdformat.next_block_start(content, content.index('# B') + 1, first_content), -1)
+
+        table = mdformat.strip_lines(content)
+        starts = [sum(len(line) + 1 for line in table.lines[:start]) for start, _ in mdformat.split_blocks(table)]
+        self.assertEqual(starts, [0, content.index('after'), content.index('# B')])
+
+    def test_parallel_matches_serial(self):
+        """Test that formatting in chunks with a process pool gives the same result."""
+        import random
+
+        rng = random.Random(11)
+        content = '\n'.join(TestStreaming.random_document(rng) for _ in range(200))
+        for chunk_size in [50, 500, 5000]:
+            with self.subTest(chunk_size=chunk_size):
+                result = mdformat.format_markdown_parallel(content, 2, chunk_size=chunk_size)
+                self.assertEqual(result, mdformat.format_markdown(content))
+
+
+class TestEngines(unittest.TestCase):
+    def test_engines_agree(self):
+        """Test that the fast engine formats like the legacy one."""
+        import random
+
+        legacy = mdformat.engine_formatter('legacy')
+        rng = random.Random(5)
+        documents = TestStreaming.DOCUMENTS + [TestStreaming.random_document(rng) for _ in range(1000)]
+        for content in documents:
+            with self.subTest(content=content):
+                self.assertEqual(mdformat.format_markdown(content), legacy(content))
+
+    def test_engine_formatter(self):
+        self.assertIs(mdformat.engine_formatter('fast'), mdformat.format_markdown)
+        with self.assertRaises(ValueError):
+            mdformat.engine_formatter('other')
+
+    def test_legacy_engine_cli(self):
+        """Test --engine legacy on a file and its refusal of fast-only modes."""
+        content = '# Title\n- Item 1\n\n- Item 2\nText   \n'
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp, 'in.md')
+            path.write_text(content, encoding='utf-8')
+
+            code, output = TestRecursive.run_main(self, '--engine', 'legacy', str(path))
+            self.assertEqual(code, 0)
+            self.assertEqual(output, mdformat.format_markdown(content))
+
+            from io import StringIO
+
+            original_stderr = sys.stderr
+            sys.stderr = StringIO()
+            try:
+                code, _ = TestRecursive.run_main(self, '--engine', 'legacy', '--stream', str(path))
+            finally:
+                sys.stderr = original_stderr
+            self.assertEqual(code, 2)
+
+
+class TestProfile(unittest.TestCase):
+    def test_profile_matches_format_markdown(self):
+        """Test that profiling formats the same and reports every step."""
+        content = '# Title\n- Item 1\n\n- Item 2\n      - Sub\nText   \n\n\n\nMore'
+        result, stats = mdformat.profile_format_markdown(content)
+
+        self.assertEqual(result, mdformat.format_markdown(content))
+        self.assertEqual([s['step'] for s in stats], [name for name, _ in mdformat.FORMAT_STEPS])
+        for step in stats:
+            self.assertGreaterEqual(step['seconds'], 0)
+            self.assertGreaterEqual(step['peak_memory'], 0)
+
+    def test_count_lines_touched(self):
+        """Test counting lines removed, added or rewritten by a step."""
+        self.assertEqual(mdformat.count_lines_touched(['a', 'b'], ['a', 'b']), 0)
+        self.assertEqual(mdformat.count_lines_touched(['a  ', 'b'], ['a', 'b']), 1)
+        self.assertEqual(mdformat.count_lines_touched(['a', '', '', 'b'], ['a', '', 'b']), 1)
+        self.assertEqual(mdformat.count_lines_touched(['# h', 'b'], ['# h', '', 'b']), 1)
+
+    def test_profile_cli_json(self):
+        """Test that --profile writes the formatted document and JSON stats on stderr."""
+        from io import StringIO
+
+        content = '# Title\nText  \n'
+        with tempfile.TemporaryDirectory() as tmp:
+            input_path = Path(tmp, 'in.md')
+            input_path.write_text(content, encoding='utf-8')
+
+            original = sys.argv, sys.stdout, sys.stderr
+            sys.argv = ['mdformat.py', '--profile', '--profile-format', 'json', str(input_path)]
+            sys.stdout, sys.stderr = StringIO(), StringIO()
+            try:
+                mdformat.main()
+                output, report = sys.stdout.getvalue(), sys.stderr.getvalue()
+            finally:
+                sys.argv, sys.stdout, sys.stderr = original
+
+        self.assertEqual(output, mdformat.format_markdown(content))
+        steps = json.loads(report)['steps']
+        self.assertEqual(len(steps), len(mdformat.FORMAT_STEPS))
+
+
+class TestServer(unittest.TestCase):
+    CONTENT = '# Title\n- Item 1\n\n- Item 2\nText   \n'
+
+    def request(self, method, params=None, started_mtime=None):
+        line = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params})
+        response, shutdown = mdformat.handle_request(line, started_mtime)
+        return json.loads(response), shutdown
+
+    def test_handle_request(self):
+        """Test the format, ping and shutdown methods and request errors."""
+        response, shutdown = self.request('format', {'content': self.CONTENT})
+        self.assertEqual(response['result'], mdformat.format_markdown(self.CONTENT))
+        self.assertFalse(shutdown)
+
+        response, _ = self.request('ping')
+        self.assertEqual(response['result']['version'], mdformat.formatter_version())
+
+        response, shutdown = self.request('shutdown')
+        self.assertTrue(shutdown)
+
+        self.assertEqual(self.request('format', {})[0]['error']['code'], -32602)
+        self.assertEqual(self.request('unknown')[0]['error']['code'], -32601)
+        response = json.loads(mdformat.handle_request('not json')[0])
+        self.assertEqual(response['error']['code'], -32700)
+
+    def test_stale_server_shuts_down(self):
+        """Test that a server refuses to format once mdformat.py changed on disk."""
+        response, shutdown = self.request('format', {'content': self.CONTENT}, mdformat.source_mtime() - 1)
+        self.assertIn('error', response)
+        self.assertTrue(shutdown)
+
+    def test_client_uses_server(self):
+        """Test the client against a server on a Unix socket, until it is shut down."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'mdformat.sock')
+            server = threading.Thread(target=mdformat.serve_socket, args=(path,))
+            server.start()
+            try:
+                for _ in range(100):
+                    if os.path.exists(path):
+                        break
+                    time.sleep(0.01)
+
+                result = mdformat_client.format_with_server(self.CONTENT, path)
+                self.assertEqual(result, mdformat.format_markdown(self.CONTENT))
+                with self.assertRaises(OSError):
+                    mdformat.serve_socket(path)
+            finally:
+                with socket.socket(socket.AF_UNIX) as sock:
+                    sock.connect(path)
+                    sock.sendall(b'{"id": 1, "method": "shutdown"}\n')
+                    sock.recv(1024)
+                server.join(5)
+
+            self.assertFalse(server.is_alive())
+            self.assertFalse(os.path.exists(path))
+
+    def test_client_falls_back_without_server(self):
+        """Test that the client formats in-process when no server is listening."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'missing.sock')
+            with self.assertRaises(OSError):
+                mdformat_client.format_with_server(self.CONTENT, path)
+            result = mdformat_client.format_content(self.CONTENT, path)
+        self.assertEqual(result, mdformat.format_markdown(self.CONTENT))
+
+    def test_default_socket_paths_agree(self):
+        """Test that the client looks for the server where it listens by default."""
+        self.assertEqual(mdformat_client.default_socket_path(), mdformat.default_socket_path())
+
+
+class TestPerformance(unittest.TestCase):
+    @staticmethod
+    def make_nested_list(line_count):
+        """Build a list whose depth goes up and down, with mixed list types and gaps."""
+        depths = list(range(8)) + list(range(6, 0, -1))
+        lines = []
+        for i in range(line_count):
+            depth = depths[i % len(depths)]
+            marker = '1.' if depth % 3 == 0 else '-'
+            lines.append('  ' * depth + f'{marker} Item {i}')
+            if i % 50 == 0:
+                lines.append('')
+        return '\n'.join(lines[:line_count])
+
+    @staticmethod
+    def time_format(content):
+        start = time.perf_counter()
+        mdformat.format_markdown(content)
+        return time.perf_counter() - start
+
+    def test_nested_list_linear_time(self):
+        """Test that a 200k-line nested list formats in linear time."""
+        small = self.make_nested_list(25000)
+        large = self.make_nested_list(200000)
+
+        small_time = min(self.time_format(small) for _ in range(3))
+        large_time = self.time_format(large)
+
+        # 8x the lines should take about 8x the time, far from the 64x of a quadratic pass
+        self.assertLess(large_time, small_time * 24)
+
+
 class TestTexts(unittest.TestCase):
     def test_list_with_spaces(self):
         input_content = """1. **重中之重：补液！补液！补液！**